@@ -1,17 +1,62 @@
 #!/usr/bin/python3
-import mysql.connector
+import time
+seed = __import__('seed')
+from query import Query
+from rows import check_row_format, convert_rows
 
-def stream_users():
-    """Generator that streams user_data table rows one by one as dictionaries."""
-    connection = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="your_mysql_password",  # Replace with your MySQL root password
-        database="ALX_prodev"
-    )
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM user_data")
-    for row in cursor:
-        yield row
-    cursor.close()
-    connection.close()
+def stream_users(chunk_size=1000, query=None, checkpoint=None,
+                 row_format='dict', metrics=None):
+    """Generator that streams user_data table rows one by one as dictionaries.
+
+    Rows are read through an unbuffered cursor, chunk_size rows at a time,
+    so the client never holds more than one chunk of the result set and
+    the first row arrives without waiting for the whole table. An optional
+    query.Query pushes column lists and filters into the SELECT.
+
+    checkpoint takes a checkpoint.Checkpoint to resume after its saved key,
+    row_format picks a row type from rows.py, and metrics takes an
+    instrument.StreamMetrics.
+    """
+    check_row_format(row_format)
+    query = query or Query()
+    if checkpoint is None:
+        statement = query.sql()
+    else:
+        statement = query.sql(checkpoint.key, checkpoint.last_key)
+    connection = seed.connect_to_prodev()
+    try:
+        as_dict = row_format == 'dict'
+        cursor = connection.cursor(dictionary=as_dict, buffered=False)
+        cursor.execute(*statement)
+        names = cursor.column_names
+        if checkpoint is not None:
+            key_at = checkpoint.key if as_dict else names.index(checkpoint.key)
+        while True:
+            start = time.perf_counter()
+            raw = cursor.fetchmany(chunk_size)
+            if not raw:
+                break
+            if metrics is not None:
+                metrics.fetched(raw, time.perf_counter() - start)
+                start = time.perf_counter()
+            if checkpoint is None:
+                if as_dict:
+                    yield from query.apply(raw)
+                else:
+                    yield from query.apply_tuples(names, raw, row_format)
+            else:
+                rows = raw if as_dict else convert_rows(names, raw, row_format)
+                for raw_row, row in zip(raw, rows):
+                    if query.matches(row if as_dict
+                                     else dict(zip(names, raw_row))):
+                        yield row
+                    checkpoint.advance(raw_row[key_at])
+            if metrics is not None:
+                metrics.consumed(time.perf_counter() - start)
+        cursor.close()
+    finally:
+        if checkpoint is not None:
+            checkpoint.save()
+        # Closing returns the connection to the pool. If the caller stopped
+        # iterating early, rows are left unread and the pool discards it.
+        connection.close()
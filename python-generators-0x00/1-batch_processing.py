@@ -1,36 +1,97 @@
 #!/usr/bin/python3
-import mysql.connector
+import time
+seed = __import__('seed')
+from adaptive import BatchSizer, batch_bytes
+from columnar import to_columns
+from query import Query
+from rows import check_row_format
 
-def stream_users_in_batches(batch_size):
-    """Generator that yields batches of rows from user_data."""
-    connection = mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="your_mysql_password",  # Replace with your MySQL password
-        database="ALX_prodev"
-    )
-    cursor = connection.cursor(dictionary=True)
+def stream_users_in_batches(batch_size, key=None, query=None, columnar=None,
+                            checkpoint=None, row_format='dict', metrics=None):
+    """Generator that yields batches of rows from user_data.
 
+    By default batches are read with LIMIT/OFFSET. Passing key (a unique,
+    indexed column such as 'user_id') switches to keyset pagination:
+    each batch seeks past the last key seen, so later batches cost the
+    same as the first one instead of rescanning every row before them.
+    An optional query.Query pushes column lists and filters into the SQL.
+
+    With columnar set to 'array' or 'numpy' each batch is a dict of one
+    typed array per column (see columnar.py) instead of a list of dicts.
+
+    checkpoint takes a checkpoint.Checkpoint to resume after its saved key,
+    row_format picks a row type from rows.py, batch_size may be 'auto' or
+    an adaptive.BatchSizer, and metrics takes an instrument.StreamMetrics.
+    """
+    check_row_format(row_format)
+    query = query or Query()
+    sizer = BatchSizer() if batch_size == 'auto' else batch_size
+    if isinstance(sizer, BatchSizer):
+        batch_size = sizer.size
+    else:
+        sizer = None
+    last_key = None
+    if checkpoint is not None:
+        if key not in (None, checkpoint.key):
+            raise ValueError(f"Checkpoint tracks {checkpoint.key}, not {key}")
+        key = checkpoint.key
+        last_key = checkpoint.last_key
+
+    connection = seed.connect_to_prodev()
+    as_dict = row_format == 'dict' and not columnar
     offset = 0
-    while True:
-        cursor.execute(
-            "SELECT * FROM user_data LIMIT %s OFFSET %s",
-            (batch_size, offset)
-        )
-        batch = cursor.fetchall()
-        if not batch:
-            break
-        yield batch
-        offset += batch_size
+    try:
+        cursor = connection.cursor(dictionary=as_dict)
+        while True:
+            start = time.perf_counter()
+            if key is None:
+                cursor.execute(*query.sql(limit=batch_size, offset=offset))
+            else:
+                cursor.execute(*query.sql(key, last_key, limit=batch_size))
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            fetched = len(batch)
+            elapsed = time.perf_counter() - start
+            offset += batch_size
+            if sizer is not None:
+                batch_size = sizer.observe(fetched, elapsed,
+                                           batch_bytes(batch))
+            if metrics is not None:
+                metrics.fetched(batch, elapsed)
+            start = time.perf_counter()
+            names = cursor.column_names
+            if key is not None:
+                last_key = batch[-1][key if as_dict else names.index(key)]
+            if as_dict:
+                batch = query.apply(batch)
+            else:
+                batch = query.apply_tuples(names, batch,
+                                           'tuple' if columnar else row_format)
+            if batch:
+                yield to_columns(names, batch, columnar) if columnar else batch
+            if metrics is not None:
+                metrics.consumed(time.perf_counter() - start)
+            if checkpoint is not None:
+                checkpoint.advance(last_key, fetched)
+        cursor.close()
+    finally:
+        if checkpoint is not None:
+            checkpoint.save()
+        connection.close()
 
-    cursor.close()
-    connection.close()
+def batch_processing(batch_size, key=None, checkpoint=None, metrics=None):
+    """Generator that yields users older than 25 from each batch.
 
-def batch_processing(batch_size):
-    """Generator that yields users older than 25 from each batch."""
+    The age filter runs in MySQL, so younger users are never fetched.
+    Pass a checkpoint.Checkpoint to resume an interrupted run, and
+    batch_size='auto' or an adaptive.BatchSizer to size batches adaptively.
+    metrics takes an instrument.StreamMetrics.
+    """
+    query = Query().where('age', '>', 25)
     def generator():
-        for batch in stream_users_in_batches(batch_size):
-            for user in batch:
-                if user['age'] > 25:
-                    yield user
+        for batch in stream_users_in_batches(batch_size, key, query,
+                                             checkpoint=checkpoint,
+                                             metrics=metrics):
+            yield from batch
     return generator()
@@ -1,20 +1,299 @@
 #!/usr/bin/python3
+import bisect
+from collections import OrderedDict
+import queue
+import threading
+import time
 seed = __import__('seed')
+from adaptive import batch_bytes
+from instrument import observe
+from query import Query
+from rows import check_row_format
 
-def paginate_users(page_size, offset):
-    connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    cursor.close()
-    connection.close()
-    return rows
-
-def lazy_pagination(page_size):
-    offset = 0
+_DONE = object()
+
+def _fetch_page(cursor, page_size, key, position, query, row_format,
+                skip=0):
+    """Fetch one page at position (an offset, or the last key seen).
+
+    skip rows after position are passed over first. Returns the page,
+    filtered by query's Python predicates and in row_format, its last key
+    and the rows as fetched, before filtering.
+    """
+    if key is None:
+        cursor.execute(*query.sql(limit=page_size, offset=position + skip))
+    else:
+        cursor.execute(*query.sql(key, position, limit=page_size,
+                                  offset=skip))
+    fetched = cursor.fetchall()
+    if not fetched or key is None:
+        last_key = None
+    elif row_format == 'dict':
+        last_key = fetched[-1][key]
+    else:
+        last_key = fetched[-1][cursor.column_names.index(key)]
+    if row_format == 'dict':
+        page = query.apply(fetched)
+    else:
+        page = query.apply_tuples(cursor.column_names, fetched, row_format)
+    return page, last_key, fetched
+
+def _iter_pages(fetch, page_size, key):
+    """Walk the table with fetch(position), yielding the non-empty pages."""
+    position = 0 if key is None else None
     while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
+        page, last_key, fetched = fetch(position)
+        if not fetched:
+            return
+        if key is None:
+            position += page_size
+        else:
+            position = last_key
+        if page:
+            yield page
+
+def _paginate(page_size, key, position, query, row_format, skip=0):
+    """Fetch one page on a connection of its own."""
+    connection = seed.connect_to_prodev()
+    try:
+        cursor = connection.cursor(dictionary=row_format == 'dict')
+        result = _fetch_page(cursor, page_size, key, position, query,
+                             row_format, skip)
+        cursor.close()
+    finally:
+        connection.close()
+    return result
+
+def paginate_users(page_size, offset, query=None, row_format='dict'):
+    query = query or Query()
+    return _paginate(page_size, None, offset, query, row_format)[0]
+
+def paginate_users_after(page_size, key, last_key=None, query=None,
+                         row_format='dict'):
+    """Fetch the page of rows whose key sorts right after last_key."""
+    query = query or Query()
+    return _paginate(page_size, key, last_key, query, row_format)[0]
+
+class PageFetcher:
+    """Fetch user_data pages ahead of the caller on a background thread.
+
+    One connection is held for the whole walk. While the caller works on
+    page N, the thread is already fetching the next ones, up to prefetch
+    pages ahead, so database round trips overlap with consumer work.
+    metrics takes an instrument.StreamMetrics.
+    """
+
+    def __init__(self, page_size, key=None, query=None, prefetch=1,
+                 row_format='dict', metrics=None):
+        self.page_size = page_size
+        self.metrics = metrics
+        self.key = key
+        self.query = query or Query()
+        self.row_format = check_row_format(row_format)
+        self.pages = queue.Queue(maxsize=max(prefetch, 1))
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        try:
+            connection = seed.connect_to_prodev()
+            try:
+                cursor = connection.cursor(
+                    dictionary=self.row_format == 'dict'
+                )
+
+                def fetch(position):
+                    start = time.perf_counter()
+                    result = _fetch_page(cursor, self.page_size, self.key,
+                                         position, self.query,
+                                         self.row_format)
+                    if self.metrics is not None:
+                        self.metrics.fetched(result[2],
+                                             time.perf_counter() - start,
+                                             stalled=False)
+                    return result
+
+                for page in _iter_pages(fetch, self.page_size, self.key):
+                    self._put(page)
+                    if self.stop.is_set():
+                        break
+                cursor.close()
+            finally:
+                connection.close()
+        except Exception as err:
+            self._put(err)
+        self._put(_DONE)
+
+    def __iter__(self):
+        self.thread.start()
+        try:
+            while True:
+                depth = self.pages.qsize()
+                start = time.perf_counter()
+                page = self.pages.get()
+                if self.metrics is not None:
+                    self.metrics.stalled(time.perf_counter() - start, depth)
+                if page is _DONE:
+                    return
+                if isinstance(page, Exception):
+                    raise page
+                start = time.perf_counter()
+                yield page
+                if self.metrics is not None:
+                    self.metrics.consumed(time.perf_counter() - start)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the background thread and release its connection."""
+        self.stop.set()
+        if self.thread.is_alive():
+            self.thread.join()
+
+class PageCache:
+    """Random access to user_data pages, with the recent ones kept in memory.
+
+    page(n) returns page n (counting from 0) of the walk lazy_pagination
+    would do. Pages are kept in an LRU cache of at most memory_limit
+    bytes, estimated with adaptive.batch_bytes. With a key, the position
+    where each fetched page starts is also recorded in a sparse index of
+    page-boundary keys, one key per page. A page whose start is known is
+    then one keyset seek; any other page is one query that seeks to the
+    nearest known boundary before it and skips the pages in between with
+    OFFSET. Without a key every page is a plain OFFSET query.
+
+    Pages hold the rows left after Python-side query filters, so they can
+    be shorter than page_size. Call clear() after the table changed.
+    """
+
+    def __init__(self, page_size, key=None, query=None,
+                 memory_limit=32 << 20, row_format='dict'):
+        self.page_size = page_size
+        self.key = key
+        self.query = query or Query()
+        self.memory_limit = memory_limit
+        self.row_format = check_row_format(row_format)
+        self.hits = 0
+        self.misses = 0
+        self.clear()
+
+    def clear(self):
+        """Forget every cached page, the boundary index and the page count."""
+        self.pages = OrderedDict()
+        self.used = 0
+        self.boundaries = {0: None}
+        self._known = [0]
+        self.page_count = None
+
+    def _record_boundary(self, number, last_key):
+        if number not in self.boundaries:
+            self.boundaries[number] = last_key
+            bisect.insort(self._known, number)
+
+    def _store(self, number, page):
+        size = batch_bytes(page)
+        if size > self.memory_limit:
+            return
+        self.pages[number] = (page, size)
+        self.used += size
+        while self.used > self.memory_limit:
+            _, (_, evicted) = self.pages.popitem(last=False)
+            self.used -= evicted
+
+    def _fetch(self, number):
+        if self.key is None:
+            position, skip = number * self.page_size, 0
+        else:
+            start = self._known[bisect.bisect(self._known, number) - 1]
+            position = self.boundaries[start]
+            skip = (number - start) * self.page_size
+        page, last_key, fetched = _paginate(self.page_size, self.key,
+                                            position, self.query,
+                                            self.row_format, skip)
+        if len(fetched) < self.page_size:
+            end = number + 1 if fetched else number
+            if self.page_count is None or end < self.page_count:
+                self.page_count = end
+        elif self.key is not None:
+            self._record_boundary(number + 1, last_key)
+        return page
+
+    def page(self, number):
+        """Return page number, from the cache or with a single query."""
+        if number < 0:
+            raise ValueError("Page numbers start at 0")
+        if number in self.pages:
+            self.hits += 1
+            self.pages.move_to_end(number)
+            return self.pages[number][0]
+        if self.page_count is not None and number >= self.page_count:
+            return []
+        self.misses += 1
+        page = self._fetch(number)
+        self._store(number, page)
+        return page
+
+    __getitem__ = page
+
+    def iter_pages(self, start=0):
+        """Yield the non-empty pages from page start to the end."""
+        number = start
+        while self.page_count is None or number < self.page_count:
+            page = self.page(number)
+            if page:
+                yield page
+            number += 1
+
+def lazy_pagination(page_size, key=None, query=None, prefetch=0,
+                    row_format='dict', cache=None, metrics=None):
+    """Lazily yield pages of user_data.
+
+    Pass key (a unique, indexed column such as 'user_id') to page with
+    keyset seeks instead of OFFSET, so deep pages are as cheap as the first.
+    With prefetch > 0 pages come from a PageFetcher that reads that many
+    pages ahead over a single connection. Python-side query filters may
+    leave some pages shorter than page_size.
+
+    row_format picks a row type from rows.py, cache takes a PageCache
+    built with the same page_size, key, query and row_format, and metrics
+    takes an instrument.StreamMetrics.
+    """
+    check_row_format(row_format)
+    if cache is not None:
+        if (cache.page_size, cache.key) != (page_size, key):
+            raise ValueError("cache was built for another page_size or key")
+        if query is not None and query is not cache.query:
+            raise ValueError("pass the query to the PageCache, not here")
+        if row_format != cache.row_format:
+            raise ValueError("cache was built for another row_format")
+        if prefetch:
+            raise ValueError("prefetch cannot be combined with a cache")
+        pages = cache.iter_pages()
+        yield from pages if metrics is None else observe(pages, metrics)
+        return
+    query = query or Query()
+    if prefetch:
+        yield from PageFetcher(page_size, key, query, prefetch, row_format,
+                               metrics)
+        return
+
+    def fetch(position):
+        start = time.perf_counter()
+        result = _paginate(page_size, key, position, query, row_format)
+        if metrics is not None:
+            metrics.fetched(result[2], time.perf_counter() - start)
+        return result
+
+    for page in _iter_pages(fetch, page_size, key):
+        start = time.perf_counter()
         yield page
-        offset += page_size
+        if metrics is not None:
+            metrics.consumed(time.perf_counter() - start)
@@ -1,28 +1,104 @@
 #!/usr/bin/python3
+from concurrent.futures import ProcessPoolExecutor
 import mysql.connector
 seed = __import__('seed')
+batch_processing = __import__('1-batch_processing')
+partitioned_scan = __import__('5-partitioned_scan')
+from aggregates import Summary
+from query import Query
+import stats
+
+def stream_user_ages(partitions=None):
+    """Generator to yield users' ages one by one.
+
+    With partitions set, the table is read in that many parallel slices,
+    each on its own connection (see 5-partitioned_scan.py).
+    """
+    if partitions:
+        query = Query(['age'])
+        for row in partitioned_scan.scan_partitions(partitions, query):
+            yield row['age']
+        return
 
-def stream_user_ages():
-    """Generator to yield users' ages one by one."""
     connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT age FROM user_data")
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT age FROM user_data")
+
+        for (age,) in cursor:
+            yield age
 
-    for row in cursor:
-        yield row['age']
+        cursor.close()
+    finally:
+        connection.close()
 
-    cursor.close()
-    connection.close()
+def stream_age_batches(batch_size=10000, backend='array'):
+    """Generator to yield users' ages as one typed array per batch."""
+    query = Query(['age'])
+    for batch in batch_processing.stream_users_in_batches(
+            batch_size, 'user_id', query, columnar=backend):
+        yield batch['age']
 
-def calculate_average_age():
+def calculate_average_age(partitions=None, batch_size=None,
+                          backend='array'):
+    """Print the average age; with batch_size set, sum columnar batches.
+
+    backend 'numpy' sums each batch with a vectorized ndarray.sum().
+    """
     total_age = 0
     count = 0
-    for age in stream_user_ages():
-        total_age += age
-        count += 1
+    if batch_size:
+        for ages in stream_age_batches(batch_size, backend):
+            total_age += ages.sum() if backend == 'numpy' else sum(ages)
+            count += len(ages)
+    else:
+        for age in stream_user_ages(partitions):
+            total_age += age
+            count += 1
 
     average = total_age / count if count else 0
     print(f"Average age of users: {average}")
 
+def calculate_average_age_from_stats():
+    """Print the average age from the trigger-maintained stats table."""
+    connection = seed.connect_to_prodev()
+    try:
+        average = stats.read_stats(connection)['mean']
+    finally:
+        connection.close()
+    print(f"Average age of users: {average}")
+
+def _summarize_slice(partitions, index, mode):
+    """Summarise the ages of one partition of user_data."""
+    predicates = partitioned_scan.partition_predicates(partitions, mode)
+    where, params = predicates[index]
+    query = Query(['age']).where_sql(where, params)
+    connection = seed.connect_to_prodev()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(*query.sql())
+        summary = Summary().update(age for (age,) in cursor)
+        cursor.close()
+    finally:
+        connection.close()
+    return summary
+
+def summarize_ages(partitions=None, mode='range'):
+    """Return count, mean, variance, quantiles and histogram of ages.
+
+    Everything is computed in a single pass (see aggregates.py). With
+    partitions set, each slice is scanned and summarised in its own
+    process, and the partial summaries are merged.
+    """
+    if not partitions:
+        return Summary().update(stream_user_ages()).result()
+    summary = Summary()
+    with ProcessPoolExecutor(max_workers=partitions) as pool:
+        slices = [pool.submit(_summarize_slice, partitions, index, mode)
+                  for index in range(partitions)]
+        for part in slices:
+            summary.merge(part.result())
+    return summary.result()
+
 if __name__ == "__main__":
     calculate_average_age()
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+import heapq
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+seed = __import__('seed')
+from query import Query
+
+_DONE = object()
+
+
+def key_ranges(partitions):
+    """Split the user_id key space into contiguous (low, high) ranges.
+
+    user_id holds uuid4 strings, whose leading hex digits are uniformly
+    distributed, so equal slices of the 32-bit prefix get equal row counts.
+    None marks an open end.
+    """
+    bounds = [f"{i * (1 << 32) // partitions:08x}"
+              for i in range(1, partitions)]
+    bounds = [None] + bounds + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def partition_predicates(partitions, mode='range'):
+    """Return one (where_sql, params) pair per slice of user_data."""
+    if mode == 'range':
+        predicates = []
+        for low, high in key_ranges(partitions):
+            clauses, params = [], []
+            if low is not None:
+                clauses.append("user_id >= %s")
+                params.append(low)
+            if high is not None:
+                clauses.append("user_id < %s")
+                params.append(high)
+            where = " AND ".join(clauses) or "1 = 1"
+            predicates.append((where, tuple(params)))
+        return predicates
+    if mode == 'hash':
+        return [
+            ("MOD(CRC32(user_id), %s) = %s", (partitions, i))
+            for i in range(partitions)
+        ]
+    raise ValueError(f"Unknown partition mode: {mode}")
+
+
+def _put(out, item, stop):
+    """Put item on a bounded queue, giving up once the scan is stopped."""
+    while not stop.is_set():
+        try:
+            out.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _scan_slice(query, ordered, chunk_size, out, stop):
+    """Stream one slice on its own connection into the out queue."""
+    try:
+        connection = seed.connect_to_prodev()
+        try:
+            cursor = connection.cursor(dictionary=True, buffered=False)
+            cursor.execute(*query.sql('user_id' if ordered else None))
+            while not stop.is_set():
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                rows = query.apply(rows)
+                if rows:
+                    _put(out, rows, stop)
+        finally:
+            connection.close()
+    except Exception as err:
+        _put(out, err, stop)
+    _put(out, _DONE, stop)
+
+
+def _drain(out):
+    """Yield rows from a slice queue until its worker reports it is done."""
+    while True:
+        item = out.get()
+        if item is _DONE:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield from item
+
+
+def scan_partitions(partitions=4, query=None, mode='range', ordered=False,
+                    chunk_size=1000, queue_size=4):
+    """Generator that scans user_data in parallel slices.
+
+    The key space is split into partitions slices (user_id ranges or
+    CRC32 hash buckets), and each slice is streamed on its own connection
+    by a worker thread. An optional query.Query sets the columns and
+    filters every slice uses. Rows come back as dictionaries, in user_id
+    order when ordered is set, otherwise in whatever order slices deliver
+    them. Each worker buffers at most queue_size chunks of chunk_size rows.
+
+    Use mode 'range' for full-table jobs: each slice is a primary-key
+    range read, so N slices together read the table once. The
+    MOD(CRC32(user_id)) filter of 'hash' mode cannot use an index, so
+    every hash slice scans the whole table. That is N times the I/O,
+    not an N-way split. It only pays off when the per-row work, not the
+    read, is the bottleneck.
+
+    Every slice holds a pooled connection for its whole scan, so
+    partitions is capped at seed.prodev_pool.size. Otherwise an ordered
+    hash merge could wait forever for slices that cannot get a connection.
+    """
+    partitions = min(partitions, seed.prodev_pool.size)
+    query = query or Query()
+    slices = [
+        query.copy().where_sql(where, params)
+        for where, params in partition_predicates(partitions, mode)
+    ]
+
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(queue_size) for _ in slices]
+    else:
+        queues = [queue.Queue(queue_size * partitions)] * partitions
+
+    with ThreadPoolExecutor(max_workers=partitions) as pool:
+        try:
+            for part, out in zip(slices, queues):
+                pool.submit(_scan_slice, part, ordered, chunk_size, out, stop)
+
+            if not ordered:
+                yield from itertools.chain.from_iterable(
+                    _drain(out) for out in queues
+                )
+            elif mode == 'range':
+                # Ranges are disjoint and already in key order.
+                for out in queues:
+                    yield from _drain(out)
+            else:
+                yield from heapq.merge(
+                    *(_drain(out) for out in queues), key=itemgetter('user_id')
+                )
+        finally:
+            stop.set()
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+import aiomysql
+seed = __import__('seed')
+from query import Query
+
+async def connect_to_prodev_async():
+    """Open an aiomysql connection to the ALX_prodev database.
+
+    Credentials come from seed.PRODEV_CONFIG; aiomysql calls the
+    database 'db'.
+    """
+    config = dict(seed.PRODEV_CONFIG)
+    config['db'] = config.pop('database')
+    return await aiomysql.connect(**config)
+
+async def async_stream_users(chunk_size=1000, query=None):
+    """Async generator that streams user_data rows one by one as dictionaries.
+
+    Rows come from a server-side cursor and the next chunk is only read
+    when the consumer asks for more, so a slow consumer holds the stream
+    back instead of letting rows pile up in memory.
+    """
+    query = query or Query()
+    connection = await connect_to_prodev_async()
+    try:
+        cursor = await connection.cursor(aiomysql.SSDictCursor)
+        await cursor.execute(*query.sql())
+        while True:
+            rows = await cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in query.apply(rows):
+                yield row
+        await cursor.close()
+    finally:
+        # Closing the socket also drops rows left unread on early exit.
+        connection.close()
+
+async def _async_pages(page_size, key, query):
+    """Async generator of pages read with OFFSET or keyset seeks."""
+    connection = await connect_to_prodev_async()
+    try:
+        cursor = await connection.cursor(aiomysql.DictCursor)
+        offset = 0
+        last_key = None
+        while True:
+            if key is None:
+                statement = query.sql(limit=page_size, offset=offset)
+            else:
+                statement = query.sql(key, last_key, limit=page_size)
+            await cursor.execute(*statement)
+            page = await cursor.fetchall()
+            if not page:
+                break
+            offset += page_size
+            if key is not None:
+                last_key = page[-1][key]
+            page = query.apply(page)
+            if page:
+                yield page
+        await cursor.close()
+    finally:
+        connection.close()
+
+async def async_stream_users_in_batches(batch_size, key=None, query=None):
+    """Async generator that yields batches of rows from user_data."""
+    async for batch in _async_pages(batch_size, key, query or Query()):
+        yield batch
+
+async def async_lazy_pagination(page_size, key=None, query=None):
+    """Async generator that lazily yields pages of user_data."""
+    async for page in _async_pages(page_size, key, query or Query()):
+        yield page
+
+async def async_stream_user_ages(chunk_size=1000):
+    """Async generator to yield users' ages one by one."""
+    async for row in async_stream_users(chunk_size, Query(['age'])):
+        yield row['age']
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+seed = __import__('seed')
+from checkpoint import Checkpoint
+from query import Query
+
+CHANGE_KEY = ('updated_at', 'user_id')
+
+def watermark(path, interval=1000):
+    """Return the Checkpoint that stores a consumer's change watermark."""
+    return Checkpoint(path, interval, key=','.join(CHANGE_KEY))
+
+def stream_changes(mark, batch_size=1000, lag=1.0, query=None):
+    """Generator that yields user_data rows changed since the watermark.
+
+    Rows come in (updated_at, user_id) order, read in keyset batches over
+    the updated_at index, so a run costs time proportional to the rows
+    that changed rather than to the table. mark is a Checkpoint from
+    watermark(); each row is recorded in it once the caller asks for
+    the next one. An empty watermark streams the whole table.
+
+    Only changes at least lag seconds old are read, so transactions that
+    commit a little after taking their timestamp are not skipped.
+    Deleted rows are not reported.
+    """
+    query = query or Query()
+    position = mark.last_key
+    connection = seed.connect_to_prodev()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT NOW(6) - INTERVAL %s MICROSECOND", (int(lag * 1e6),)
+        )
+        (until,) = cursor.fetchone()
+        cursor.close()
+
+        bounded = query.copy().where_sql("updated_at <= %s", (until,))
+        cursor = connection.cursor(dictionary=True)
+        while True:
+            cursor.execute(
+                *bounded.sql(CHANGE_KEY, position, limit=batch_size)
+            )
+            batch = cursor.fetchall()
+            if not batch:
+                break
+            for row in batch:
+                if bounded.matches(row):
+                    yield row
+                position = [str(row['updated_at']), row['user_id']]
+                mark.advance(position)
+        cursor.close()
+    finally:
+        mark.save()
+        connection.close()
@@ -0,0 +1,74 @@
+#!/usr/bin/python3
+"""Batch sizes that adapt to how fast rows arrive and how big they are.
+
+A fixed batch size trades round trips against memory, and the right
+value depends on the server, the network and the columns selected.
+BatchSizer picks it as it goes: after every batch it is told how many
+rows came back, how long the fetch took and roughly how many bytes they
+take, and it sizes the next batch so that a fetch takes about
+target_seconds and a batch stays under memory_limit bytes. Each step
+grows or shrinks the size by at most max_step times, and the size is
+always kept between minimum and maximum.
+
+    sizer = BatchSizer(target_seconds=0.05, memory_limit=8 << 20)
+    for batch in stream_users_in_batches(sizer, 'user_id'):
+        ...
+"""
+from external_sort import approximate_size
+
+SAMPLE_ROWS = 16
+
+
+def batch_bytes(batch):
+    """Estimate the in-memory size of a list of rows from a few of them."""
+    if not batch:
+        return 0
+    sample = batch[:SAMPLE_ROWS]
+    average = sum(approximate_size(row) for row in sample) / len(sample)
+    return int(average * len(batch))
+
+
+class BatchSizer:
+    """Choose the size of the next batch from the ones fetched so far."""
+
+    def __init__(self, initial=1000, minimum=100, maximum=100000,
+                 target_seconds=0.1, memory_limit=16 << 20, max_step=2.0,
+                 smoothing=0.5):
+        if not 0 < minimum <= maximum:
+            raise ValueError("Batch size bounds must satisfy "
+                             "0 < minimum <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = min(max(initial, minimum), maximum)
+        self.target_seconds = target_seconds
+        self.memory_limit = memory_limit
+        self.max_step = max_step
+        self.smoothing = smoothing
+        self.seconds_per_row = None
+        self.bytes_per_row = None
+
+    def _smooth(self, previous, sample):
+        if previous is None:
+            return sample
+        return previous + self.smoothing * (sample - previous)
+
+    def observe(self, rows, seconds, nbytes):
+        """Record one fetched batch and return the size for the next one."""
+        if rows <= 0:
+            return self.size
+        self.seconds_per_row = self._smooth(self.seconds_per_row,
+                                            seconds / rows)
+        self.bytes_per_row = self._smooth(self.bytes_per_row, nbytes / rows)
+
+        wanted = self.maximum
+        if self.seconds_per_row > 0:
+            wanted = min(wanted, self.target_seconds / self.seconds_per_row)
+        if self.bytes_per_row > 0:
+            wanted = min(wanted, self.memory_limit / self.bytes_per_row)
+        # A short final batch says nothing about larger ones; do not grow.
+        if rows < self.size:
+            wanted = min(wanted, self.size)
+        wanted = min(max(wanted, self.size / self.max_step),
+                     self.size * self.max_step)
+        self.size = int(min(max(wanted, self.minimum), self.maximum))
+        return self.size
@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+"""Single-pass, mergeable aggregates for streams of numbers such as ages.
+
+Summary computes in one pass over a stream:
+- count, mean, variance, min and max, with Welford's numerically stable
+  update;
+- approximate quantiles (median, p95, ...) from a KLL sketch;
+- an exact fixed-width histogram.
+
+Every part can be merged with the same part computed over another slice
+of the data. Partitions can therefore be summarised in parallel and
+combined afterwards (see summarize_ages in 4-stream_ages.py).
+"""
+import math
+import random
+from collections import Counter
+
+
+class RunningStats:
+    """Count, mean, variance, min and max in O(1) memory."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Fold another RunningStats in (Chan et al. parallel update)."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.__dict__.update(other.__dict__)
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance."""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class KLLSketch:
+    """Mergeable quantile sketch after Karnin, Lang and Liberty (2016).
+
+    Level h holds items that each stand for 2**h inputs. A full level is
+    sorted and every other item, picked from a random offset, is promoted
+    to the level above. Memory stays around 3k items, and rank error is
+    roughly 1.7 / k.
+    """
+
+    def __init__(self, k=200, rng=None):
+        self.k = k
+        self.rng = rng or random.Random()
+        self.levels = []
+        self.size = 0
+        self.max_size = 0
+        self._grow()
+
+    def _grow(self):
+        self.levels.append([])
+        self.max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _capacity(self, height):
+        depth = len(self.levels) - height - 1
+        return int(math.ceil(self.k * (2 / 3) ** depth)) + 1
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        for height, items in enumerate(self.levels):
+            if len(items) >= self._capacity(height):
+                if height + 1 >= len(self.levels):
+                    self._grow()
+                items.sort()
+                # An odd item out stays behind at this level.
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = self.rng.random() < 0.5
+                self.levels[height + 1].extend(items[offset::2])
+                items[:] = keep
+                self.size = sum(len(level) for level in self.levels)
+                if self.size < self.max_size:
+                    break
+
+    def merge(self, other):
+        """Fold another sketch in; the result sketches both inputs."""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for height, items in enumerate(other.levels):
+            self.levels[height].extend(items)
+        self.size = sum(len(level) for level in self.levels)
+        while self.size >= self.max_size:
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """Return an item whose rank is about q * count, or None if empty."""
+        weighted = sorted(
+            (item, 1 << height)
+            for height, items in enumerate(self.levels)
+            for item in items
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for item, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return item
+        return weighted[-1][0]
+
+
+class Summary:
+    """All the aggregates above, fed and merged together."""
+
+    def __init__(self, k=200, bucket_width=10):
+        self.stats = RunningStats()
+        self.sketch = KLLSketch(k)
+        self.bucket_width = bucket_width
+        self.histogram = Counter()
+
+    def add(self, value):
+        value = float(value)
+        self.stats.add(value)
+        self.sketch.add(value)
+        self.histogram[int(value // self.bucket_width)] += 1
+
+    def update(self, values):
+        """Add every value of an iterable; return self for chaining."""
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other):
+        """Fold in a Summary computed over another partition."""
+        if other.bucket_width != self.bucket_width:
+            raise ValueError("Cannot merge histograms of different widths")
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        self.histogram.update(other.histogram)
+        return self
+
+    def result(self, quantiles=(0.5, 0.95, 0.99)):
+        """Return the aggregates as a plain dict."""
+        width = self.bucket_width
+        return {
+            'count': self.stats.count,
+            'mean': self.stats.mean,
+            'variance': self.stats.variance,
+            'stddev': self.stats.stddev,
+            'min': self.stats.min,
+            'max': self.stats.max,
+            'quantiles': {q: self.sketch.quantile(q) for q in quantiles},
+            'histogram': {
+                (bucket * width, (bucket + 1) * width): count
+                for bucket, count in sorted(self.histogram.items())
+            },
+        }
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+"""Benchmark the user_data generators against a local SQLite stand-in.
+
+Seeds SQLite files with synthetic user_data rows (through sqlite_compat),
+points seed.connect_to_prodev at them and runs every generator over a
+grid of batch/page sizes, recording rows/s, time to first row and peak
+traced memory. Results are printed as a table and written to a JSON file
+so runs can be compared against each other.
+
+Usage: ./benchmark.py --rows 100000 1000000 --sizes 100 1000 10000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import time
+import tracemalloc
+import uuid
+seed = __import__('seed')
+import sqlite_compat
+
+stream_users = __import__('0-stream_users')
+batch_processing = __import__('1-batch_processing')
+lazy_paginate = __import__('2-lazy_paginate')
+stream_ages = __import__('4-stream_ages')
+
+
+def seed_sqlite(path, rows, batch_size=50000):
+    """Create path with `rows` synthetic user_data rows unless it has them."""
+    connection = sqlite_compat.connect(path)
+    sqlite_compat.create_table(connection)
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    existing = cursor.fetchone()[0]
+    if existing != rows:
+        cursor.execute("DELETE FROM user_data")
+        rng = random.Random(rows)
+        for start in range(0, rows, batch_size):
+            cursor.executemany(
+                "INSERT INTO user_data (user_id, name, email, age) "
+                "VALUES (%s, %s, %s, %s)",
+                [(str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                  f"User {i}", f"user{i}@example.com", rng.randint(18, 90))
+                 for i in range(start, min(start + batch_size, rows))]
+            )
+            connection.commit()
+    cursor.close()
+    connection.close()
+
+
+def cases(size):
+    """Yield (name, unit, factory) for every generator at one batch size.
+
+    unit is 'row' when the generator yields rows and 'batch' when it
+    yields lists (or columnar dicts) of rows.
+    """
+    yield ('stream_users', 'row',
+           lambda: stream_users.stream_users(chunk_size=size))
+    yield ('stream_users[namedtuple]', 'row',
+           lambda: stream_users.stream_users(size, row_format='namedtuple'))
+    yield ('batch_processing[offset]', 'row',
+           lambda: batch_processing.batch_processing(size))
+    yield ('batch_processing[keyset]', 'row',
+           lambda: batch_processing.batch_processing(size, 'user_id'))
+    yield ('lazy_pagination[offset]', 'batch',
+           lambda: lazy_paginate.lazy_pagination(size))
+    yield ('lazy_pagination[keyset]', 'batch',
+           lambda: lazy_paginate.lazy_pagination(size, 'user_id'))
+    yield ('lazy_pagination[prefetch=2]', 'batch',
+           lambda: lazy_paginate.lazy_pagination(size, 'user_id', prefetch=2))
+    yield ('stream_age_batches', 'batch',
+           lambda: stream_ages.stream_age_batches(size))
+
+
+def measure(factory, unit, trace_memory=True):
+    """Drain one generator; return its timings, row count and peak memory."""
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    first_row = None
+    rows = 0
+    for item in factory():
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        rows += len(item) if unit == 'batch' else 1
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 4),
+        'rows_per_second': round(rows / elapsed) if elapsed else None,
+        'first_row_seconds': first_row and round(first_row, 6),
+        'peak_memory_bytes': peak,
+    }
+
+
+def measure_average_age(table_rows, trace_memory=True):
+    """Time calculate_average_age, which prints instead of yielding."""
+    def factory():
+        with contextlib.redirect_stdout(io.StringIO()):
+            stream_ages.calculate_average_age()
+        return iter(())
+    result = measure(factory, 'row', trace_memory)
+    result['rows'] = table_rows
+    if result['seconds']:
+        result['rows_per_second'] = round(table_rows / result['seconds'])
+    return result
+
+
+def run(row_counts, sizes, directory, trace_memory=True):
+    """Run the whole grid and return a list of result dicts."""
+    results = []
+    original_connect = seed.connect_to_prodev
+    try:
+        for rows in row_counts:
+            path = os.path.join(directory, f"bench_user_data_{rows}.db")
+            seed_sqlite(path, rows)
+            seed.connect_to_prodev = lambda: sqlite_compat.connect(path)
+            result = measure_average_age(rows, trace_memory)
+            results.append(dict(table_rows=rows,
+                                generator='calculate_average_age',
+                                size=None, **result))
+            print_result(results[-1])
+            for size in sizes:
+                for name, unit, factory in cases(size):
+                    result = measure(factory, unit, trace_memory)
+                    results.append(dict(table_rows=rows, generator=name,
+                                        size=size, **result))
+                    print_result(results[-1])
+    finally:
+        seed.connect_to_prodev = original_connect
+    return results
+
+
+def print_result(result):
+    """Print one result as a fixed-width report line."""
+    first_row = result['first_row_seconds']
+    peak = result['peak_memory_bytes']
+    print(f"{result['table_rows']:>10} {result['generator']:<30} "
+          f"{result['size'] or '-':>6} {result['rows_per_second'] or 0:>10} "
+          f"{'-' if first_row is None else f'{first_row:.4f}':>9} "
+          f"{'-' if peak is None else peak // 1024:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000],
+                        help="table sizes to seed, e.g. 100000 1000000")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 1000, 10000],
+                        help="batch/page sizes to run every generator with")
+    parser.add_argument('--dir', default='.',
+                        help="directory for the SQLite benchmark files")
+    parser.add_argument('--output', default='bench_report.json',
+                        help="where to write the JSON report")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="skip tracemalloc, which slows every generator")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'generator':<30} {'size':>6} {'rows/s':>10} "
+          f"{'first(s)':>9} {'peak(KiB)':>9}")
+    results = run(args.rows, args.sizes, args.dir, not args.no_memory)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""Durable resume points for long scans over user_data.
+
+A Checkpoint remembers the last key a generator delivered and writes it to
+a small JSON file every `interval` rows (and when the generator stops).
+Writes go to a temporary file that is fsynced and renamed over the old
+one, so a crash leaves either the previous or the new checkpoint, never a
+torn one. A restarted generator given the same Checkpoint resumes with
+the row after the saved key. Rows are recorded only once the consumer
+asks for the next one, so delivery is at-least-once.
+"""
+import json
+import os
+
+
+class Checkpoint:
+    """Last delivered key of a keyset scan, saved to path."""
+
+    def __init__(self, path, interval=1000, key='user_id'):
+        self.path = path
+        self.interval = interval
+        self.key = key
+        self.pending = 0
+        self.last_key = self.load()
+
+    def load(self):
+        """Return the saved key, or None when there is no checkpoint yet."""
+        try:
+            with open(self.path) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return None
+        if state.get('key') != self.key:
+            raise ValueError(
+                f"Checkpoint {self.path} tracks {state.get('key')}, "
+                f"not {self.key}"
+            )
+        return state.get('last_key')
+
+    def advance(self, last_key, rows=1):
+        """Record that rows up to last_key were delivered."""
+        self.last_key = last_key
+        self.pending += rows
+        if self.pending >= self.interval:
+            self.save()
+
+    def save(self):
+        """Write the current key to disk atomically and durably."""
+        if self.last_key is None:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({'key': self.key, 'last_key': self.last_key}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        directory = os.open(os.path.dirname(os.path.abspath(self.path)),
+                            os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+        self.pending = 0
+
+    def reset(self):
+        """Forget the saved position so the next scan starts from the top."""
+        self.last_key = None
+        self.pending = 0
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
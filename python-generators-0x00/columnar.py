@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+"""Turn batches of user_data rows into one typed array per column.
+
+Numeric columns become array.array (or NumPy arrays) of machine doubles
+instead of one Python object per value, so aggregates can run over a
+whole batch at once. Text columns stay plain lists.
+"""
+import array
+
+TYPECODES = {'age': 'd'}
+
+
+def to_columns(names, rows, backend='array'):
+    """Transpose row tuples into a {column: values} dict.
+
+    backend is 'array' for array.array columns or 'numpy' for NumPy
+    arrays; NumPy is only imported when it is asked for.
+    """
+    if backend == 'numpy':
+        import numpy
+    elif backend != 'array':
+        raise ValueError(f"Unknown columnar backend: {backend}")
+
+    values_by_column = zip(*rows) if rows else ([] for _ in names)
+    columns = {}
+    for name, values in zip(names, values_by_column):
+        typecode = TYPECODES.get(name)
+        if backend == 'numpy':
+            columns[name] = numpy.array(
+                values, dtype=numpy.float64 if typecode else object
+            )
+        elif typecode:
+            columns[name] = array.array(typecode, map(float, values))
+        else:
+            columns[name] = list(values)
+    return columns
@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+"""A small, thread-safe pool of database connections.
+
+ConnectionPool keeps up to `size` connections made by a connect()
+function and hands them out with checkout(). What callers get is a
+PooledConnection that behaves like the connection itself, except that
+close() returns it to the pool. Code written for one connection per
+call therefore stops paying for a TCP and auth handshake every time
+without changing.
+
+On the way back a connection is rolled back, so the next user starts a
+fresh transaction (and sees rows committed in between). A connection
+that still has unread rows, for example from a stream the caller
+stopped early, is closed instead of pooled. Before an idle connection
+is handed out again after health_check_after seconds, it is pinged and
+replaced if the server dropped it. metrics() reports checkouts, reuse,
+health-check failures and the time callers spent waiting for a free
+connection.
+
+seed.connect_to_prodev checks out from the shared ALX_prodev pool:
+
+    with seed.prodev_pool.connection() as connection:
+        ...
+"""
+import contextlib
+import os
+import threading
+import time
+from mysql.connector.errors import PoolError
+
+
+class PooledConnection:
+    """A checked-out connection; close() hands it back to its pool."""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._pid = os.getpid()
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise PoolError("Connection was returned to the pool")
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Return the connection to the pool; calling it again is a no-op."""
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            self._pool.release(connection, self._pid)
+
+    def __del__(self):
+        # A wrapper dropped without close() still gives its slot back.
+        if self.__dict__.get('_connection') is not None:
+            self.close()
+
+
+class ConnectionPool:
+    """Hand out at most `size` connections made by connect().
+
+    checkout() waits up to timeout seconds for a free connection and
+    raises PoolError after that.
+    """
+
+    def __init__(self, connect, size=8, timeout=30.0,
+                 health_check_after=30.0):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._available = threading.Condition()
+        self._idle = []
+        self._in_use = 0
+        self._pid = os.getpid()
+        self._inherited = []
+        self._metrics = dict.fromkeys(
+            ('checkouts', 'created', 'reused', 'discarded',
+             'health_check_failures', 'waits'), 0
+        )
+        self._metrics.update(wait_seconds=0.0, max_wait_seconds=0.0)
+
+    def _after_fork(self):
+        """Forget connections that belong to the parent process.
+
+        A forked worker shares the parent's sockets. The inherited
+        connections are kept referenced but never used, so nothing is
+        sent over them from this process.
+        """
+        if self._pid != os.getpid():
+            self._inherited.extend(connection for connection, _ in self._idle)
+            self._idle = []
+            self._in_use = 0
+            self._pid = os.getpid()
+
+    def checkout(self, timeout=None):
+        """Return a PooledConnection, opening a connection if needed."""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with self._available:
+            self._after_fork()
+            waited = False
+            while not self._idle and self._in_use >= self.size:
+                remaining = start + timeout - time.perf_counter()
+                if remaining <= 0:
+                    raise PoolError(f"No connection free after {timeout}s "
+                                    f"({self.size} in use)")
+                waited = True
+                self._available.wait(remaining)
+            self._in_use += 1
+            idle = self._idle.pop() if self._idle else None
+            wait = time.perf_counter() - start
+            metrics = self._metrics
+            metrics['checkouts'] += 1
+            metrics['waits'] += waited
+            metrics['wait_seconds'] += wait
+            metrics['max_wait_seconds'] = max(metrics['max_wait_seconds'],
+                                              wait)
+        try:
+            connection = self._healthy(idle)
+        except Exception:
+            with self._available:
+                self._in_use -= 1
+                self._available.notify()
+            raise
+        return PooledConnection(self, connection)
+
+    def _healthy(self, idle):
+        """Reuse the idle connection if it is still alive, else open one."""
+        if idle is not None:
+            connection, released = idle
+            if (time.monotonic() - released < self.health_check_after
+                    or self._ping(connection)):
+                self._count('reused')
+                return connection
+            self._count('health_check_failures')
+            self._close(connection)
+        connection = self.connect()
+        self._count('created')
+        return connection
+
+    def release(self, connection, pid=None):
+        """Take a connection back, or close it if it cannot be reused.
+
+        pid is the process that checked it out. A connection checked out
+        before a fork is only kept referenced in the child: rolling it
+        back or pooling it there would talk over the parent's socket.
+        """
+        if pid is not None and pid != os.getpid():
+            with self._available:
+                self._inherited.append(connection)
+            return
+        reusable = not getattr(connection, 'unread_result', False)
+        if reusable:
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+        with self._available:
+            if self._pid != os.getpid():
+                return
+            self._in_use -= 1
+            if reusable:
+                self._idle.append((connection, time.monotonic()))
+            self._available.notify()
+        if not reusable:
+            self._count('discarded')
+            self._close(connection)
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        """Check a connection out for the duration of a with block."""
+        connection = self.checkout(timeout)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def health_check(self):
+        """Ping every idle connection and drop the dead ones.
+
+        While they are being pinged the connections count as in use, so
+        checkouts in the meantime wait instead of going over size.
+        Returns the number of connections dropped.
+        """
+        with self._available:
+            self._after_fork()
+            idle, self._idle = self._idle, []
+            self._in_use += len(idle)
+        alive = []
+        for connection, released in idle:
+            if self._ping(connection):
+                alive.append((connection, released))
+            else:
+                self._count('health_check_failures')
+                self._close(connection)
+        with self._available:
+            self._in_use -= len(idle)
+            self._idle.extend(alive)
+            self._available.notify(len(idle))
+        return len(idle) - len(alive)
+
+    def metrics(self):
+        """Snapshot of the pool counters and current usage."""
+        with self._available:
+            metrics = dict(self._metrics, size=self.size,
+                           in_use=self._in_use, idle=len(self._idle))
+        checkouts = metrics['checkouts']
+        metrics['mean_wait_seconds'] = (metrics['wait_seconds'] / checkouts
+                                        if checkouts else 0.0)
+        return metrics
+
+    def close_all(self):
+        """Close the idle connections; checked-out ones close on return."""
+        with self._available:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _count(self, name):
+        with self._available:
+            self._metrics[name] += 1
+
+    @staticmethod
+    def _ping(connection):
+        try:
+            return connection.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
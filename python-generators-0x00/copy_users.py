@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+"""Copy user_data between MySQL and SQLite in large, pipelined batches.
+
+An endpoint is either 'mysql' (ALX_prodev through seed.connect_to_prodev)
+or the path of a SQLite file (through sqlite_compat). The source is read
+in keyset batches on a background thread (a pipeline.Pipeline source
+stage), while the main thread writes the previous batch to the target
+with one executemany and one commit per batch. Reading and writing
+therefore overlap, and at most `prefetch` batches wait in between.
+Rows that already exist in the target are overwritten, so a copy can be
+re-run. Into MySQL, each batch updates the stats tables once instead of
+row by row (see stats.defer_stats).
+
+Usage: ./copy_users.py mysql analytics.db
+       ./copy_users.py analytics.db mysql
+"""
+import argparse
+import time
+seed = __import__('seed')
+import sqlite_compat
+import stats
+from pipeline import Pipeline
+from query import Query
+
+COPY_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+
+def connect(endpoint):
+    """Open 'mysql' or a SQLite path as a mysql.connector-like connection."""
+    if endpoint == 'mysql':
+        return seed.connect_to_prodev()
+    return sqlite_compat.connect(endpoint)
+
+
+def _insert_statement(connection):
+    """Upsert statement for the target's SQL dialect."""
+    columns = ", ".join(COPY_COLUMNS)
+    placeholders = ", ".join(["%s"] * len(COPY_COLUMNS))
+    if isinstance(connection, sqlite_compat.Connection):
+        return (f"INSERT OR REPLACE INTO user_data ({columns}) "
+                f"VALUES ({placeholders})")
+    updates = ", ".join(f"{column} = VALUES({column})"
+                        for column in COPY_COLUMNS[1:])
+    return (f"INSERT INTO user_data ({columns}) VALUES ({placeholders}) "
+            f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+def _create_target(connection):
+    if isinstance(connection, sqlite_compat.Connection):
+        sqlite_compat.create_table(connection)
+    else:
+        seed.create_table(connection)
+
+
+def read_batches(connection, batch_size):
+    """Generator of row-tuple batches from the source, in user_id order."""
+    query = Query(COPY_COLUMNS)
+    cursor = connection.cursor()
+    last_key = None
+    while True:
+        cursor.execute(*query.sql('user_id', last_key, limit=batch_size))
+        batch = cursor.fetchall()
+        if not batch:
+            break
+        last_key = batch[-1][0]
+        yield batch
+    cursor.close()
+
+
+def copy_users(source, target, batch_size=5000, prefetch=2):
+    """Copy every user_data row from source to target; return the count."""
+    source_connection = connect(source)
+    try:
+        target_connection = connect(target)
+    except Exception:
+        source_connection.close()
+        raise
+    try:
+        _create_target(target_connection)
+        insert = _insert_statement(target_connection)
+        to_mysql = not isinstance(target_connection, sqlite_compat.Connection)
+        cursor = target_connection.cursor()
+        start = time.perf_counter()
+        copied = 0
+        batches = Pipeline(read_batches(source_connection, batch_size),
+                           mode='thread', queue_size=prefetch)
+        try:
+            for batch in batches:
+                try:
+                    if to_mysql:
+                        stats.defer_stats(cursor)
+                    cursor.executemany(insert, batch)
+                    if to_mysql:
+                        stats.apply_deferred(cursor)
+                    target_connection.commit()
+                except Exception:
+                    target_connection.rollback()
+                    raise
+                copied += len(batch)
+        finally:
+            if to_mysql:
+                stats.end_deferred(cursor)
+        cursor.close()
+        elapsed = time.perf_counter() - start
+        rate = copied / elapsed if elapsed else 0
+        print(f"Copied {copied} rows from {source} to {target} "
+              f"in {elapsed:.2f}s ({rate:.0f} rows/s)")
+        return copied
+    finally:
+        source_connection.close()
+        target_connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help="'mysql' or a SQLite file path")
+    parser.add_argument('target', help="'mysql' or a SQLite file path")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--prefetch', type=int, default=2)
+    args = parser.parse_args()
+    copy_users(args.source, args.target, args.batch_size, args.prefetch)
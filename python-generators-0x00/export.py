@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+"""Stream user_data into NDJSON, CSV, Parquet or Arrow IPC files.
+
+Rows are read with keyset batches in columnar form (see
+1-batch_processing.py and columnar.py), and every batch is written out
+before the next one is fetched, so memory stays at one batch however
+large the table is. Text formats are compressed on the fly when the file
+name ends in .gz, .bz2 or .xz. Parquet and Arrow IPC need pyarrow,
+which is only imported for those formats.
+
+Usage: ./export.py users.ndjson.gz [--batch-size 10000]
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import sys
+import time
+batch_processing = __import__('1-batch_processing')
+from query import Query
+
+TEXT_OPENERS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+FORMATS = {
+    '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv',
+    '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow',
+}
+
+
+def detect_format(path):
+    """Return (format, compression suffix) for an output file name."""
+    name = path.lower()
+    compression = None
+    for suffix in TEXT_OPENERS:
+        if name.endswith(suffix):
+            compression = suffix
+            name = name[:-len(suffix)]
+    for suffix, fmt in FORMATS.items():
+        if name.endswith(suffix):
+            return fmt, compression
+    raise ValueError(f"Cannot tell the export format of {path}")
+
+
+def open_text(path, compression):
+    """Open a text file for writing, compressed according to its suffix."""
+    if compression is None:
+        return open(path, 'w', newline='')
+    return TEXT_OPENERS[compression](path, 'wt', newline='')
+
+
+def report_progress(rows, elapsed):
+    """Default progress callback: rows so far and rows/s on stderr."""
+    rate = rows / elapsed if elapsed else 0
+    print(f"{rows} rows exported ({rate:.0f} rows/s)", file=sys.stderr)
+
+
+class _TextWriter:
+    """Writes columnar batches as NDJSON lines or CSV records."""
+
+    def __init__(self, path, fmt, compression):
+        self.fmt = fmt
+        self.file = open_text(path, compression)
+        self.csv = csv.writer(self.file) if fmt == 'csv' else None
+        self.header_written = False
+
+    def write(self, names, columns):
+        rows = zip(*columns)
+        if self.csv is not None:
+            if not self.header_written:
+                self.csv.writerow(names)
+                self.header_written = True
+            self.csv.writerows(rows)
+        else:
+            self.file.writelines(
+                json.dumps(dict(zip(names, row)), default=str) + "\n"
+                for row in rows
+            )
+
+    def close(self):
+        self.file.close()
+
+
+class _ArrowWriter:
+    """Writes columnar batches as Parquet row groups or Arrow IPC batches."""
+
+    def __init__(self, path, fmt, compression):
+        import pyarrow
+        self.pyarrow = pyarrow
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression or 'zstd'
+        self.writer = None
+
+    def write(self, names, columns):
+        pa = self.pyarrow
+        table = pa.table({
+            name: pa.array(column) for name, column in zip(names, columns)
+        })
+        if self.writer is None:
+            if self.fmt == 'parquet':
+                import pyarrow.parquet
+                self.writer = pyarrow.parquet.ParquetWriter(
+                    self.path, table.schema, compression=self.compression
+                )
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=self.compression)
+                self.writer = pa.ipc.new_file(
+                    self.path, table.schema, options=options
+                )
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def export_users(path, batch_size=10000, query=None, fmt=None,
+                 compression=None, progress=report_progress):
+    """Export user_data to path one batch at a time; return the row count.
+
+    fmt and compression are taken from the file name unless given; for
+    Parquet/Arrow, compression is a codec name such as 'zstd' or 'snappy'.
+    progress(rows, elapsed_seconds) is called after every batch.
+    """
+    query = query or Query()
+    if fmt is None:
+        fmt, suffix = detect_format(path)
+        if fmt in ('ndjson', 'csv'):
+            compression = compression or suffix
+    if fmt in ('ndjson', 'csv'):
+        writer = _TextWriter(path, fmt, compression)
+    else:
+        writer = _ArrowWriter(path, fmt, compression)
+
+    start = time.perf_counter()
+    rows = 0
+    try:
+        for batch in batch_processing.stream_users_in_batches(
+                batch_size, 'user_id', query, columnar='array'):
+            # The keyset adds user_id to the SELECT; keep only what was asked.
+            names = list(query.columns or batch)
+            writer.write(names, [batch[name] for name in names])
+            rows += len(batch[names[0]])
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+    finally:
+        writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help="output file, e.g. users.ndjson.gz")
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--columns', nargs='+',
+                        help="only export these user_data columns")
+    args = parser.parse_args()
+    query = Query(args.columns) if args.columns else None
+    export_users(args.path, args.batch_size, query)
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+"""Sort and group streams of rows that do not fit in memory.
+
+external_sort buffers rows up to a memory budget. It sorts each full
+buffer and spills it as a run to a temporary file, then k-way merges the
+runs with heapq.merge. When there are more runs than max_fan_in, they are
+merged in several passes. Runs are written and read back in chunks of
+about memory_limit / max_fan_in bytes, so a merge holding one chunk of
+each run, like the buffer before it, stays around memory_limit however
+many rows come in. If everything fits, nothing touches the disk.
+
+external_group_by builds on it to group rows by a column that has no
+index, for example:
+
+    stream_users = __import__('0-stream_users').stream_users
+    counts = external_group_by(stream_users(), itemgetter('name'),
+                               aggregate=lambda rows: sum(1 for _ in rows))
+    for name, count in counts:
+        ...
+"""
+import heapq
+import itertools
+import pickle
+import sys
+import tempfile
+
+CHUNK_ROWS = 1000
+
+
+def approximate_size(item):
+    """Rough in-memory size of a row in bytes, counting its values."""
+    size = sys.getsizeof(item)
+    if isinstance(item, dict):
+        values = item.values()
+    elif isinstance(item, (tuple, list)):
+        values = item
+    else:
+        return size
+    return size + sum(sys.getsizeof(value) for value in values)
+
+
+def _chunk_rows(memory_limit, max_fan_in, row_bytes):
+    """Rows per chunk so that one chunk of each merged run fits the budget."""
+    return max(1, min(CHUNK_ROWS, int(memory_limit / max_fan_in / row_bytes)))
+
+
+def _spill(items, tmpdir, chunk_rows):
+    """Write items to a temporary file in pickled chunks; return the file."""
+    run = tempfile.TemporaryFile(dir=tmpdir)
+    for start in range(0, len(items), chunk_rows):
+        pickle.dump(items[start:start + chunk_rows], run,
+                    pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+
+def _read(run):
+    """Yield the items of a spilled run back in order."""
+    while True:
+        try:
+            chunk = pickle.load(run)
+        except EOFError:
+            return
+        yield from chunk
+
+
+def _merge_runs(runs, key, reverse, tmpdir, chunk_rows):
+    """Merge several spilled runs into a single new run."""
+    merged = tempfile.TemporaryFile(dir=tmpdir)
+    items = heapq.merge(*(_read(run) for run in runs), key=key,
+                        reverse=reverse)
+    while True:
+        chunk = list(itertools.islice(items, chunk_rows))
+        if not chunk:
+            break
+        pickle.dump(chunk, merged, pickle.HIGHEST_PROTOCOL)
+    for run in runs:
+        run.close()
+    merged.seek(0)
+    return merged
+
+
+def external_sort(iterable, key=None, reverse=False, memory_limit=64 << 20,
+                  max_fan_in=64, tmpdir=None):
+    """Generator that yields the items of iterable in sorted order.
+
+    The sort is stable, like sorted(). memory_limit is a budget in bytes
+    as estimated by approximate_size.
+    """
+    runs = []
+    buffer = []
+    used = 0
+    seen_bytes = seen_rows = 0
+    try:
+        for item in iterable:
+            buffer.append(item)
+            size = approximate_size(item)
+            used += size
+            seen_bytes += size
+            seen_rows += 1
+            if used >= memory_limit:
+                buffer.sort(key=key, reverse=reverse)
+                chunk_rows = _chunk_rows(memory_limit, max_fan_in,
+                                         seen_bytes / seen_rows)
+                runs.append(_spill(buffer, tmpdir, chunk_rows))
+                buffer = []
+                used = 0
+        buffer.sort(key=key, reverse=reverse)
+        if not runs:
+            yield from buffer
+            return
+        chunk_rows = _chunk_rows(memory_limit, max_fan_in,
+                                 seen_bytes / seen_rows)
+        if buffer:
+            runs.append(_spill(buffer, tmpdir, chunk_rows))
+            buffer = []
+
+        while len(runs) > max_fan_in:
+            runs = [
+                _merge_runs(runs[start:start + max_fan_in], key, reverse,
+                            tmpdir, chunk_rows)
+                for start in range(0, len(runs), max_fan_in)
+            ]
+        yield from heapq.merge(*(_read(run) for run in runs), key=key,
+                               reverse=reverse)
+    finally:
+        for run in runs:
+            run.close()
+
+
+def external_group_by(iterable, key, aggregate=None, **sort_options):
+    """Generator of (group key, group) pairs in key order.
+
+    Rows are sorted with external_sort (sort_options are passed on), then
+    grouped. The group is an iterator over its rows, or aggregate(rows)
+    when an aggregate function is given.
+    """
+    rows = external_sort(iterable, key=key, **sort_options)
+    for group_key, group in itertools.groupby(rows, key=key):
+        yield group_key, group if aggregate is None else aggregate(group)
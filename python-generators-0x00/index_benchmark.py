@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""Compare the user_data access paths before and after migrate_indexes.
+
+Copies user_data into a scratch table with the old schema (the primary
+key plus a duplicate INDEX(user_id), nothing on email or age), times the
+queries the generators run and records the plan MySQL picks for each
+(EXPLAIN key, rows and Extra). It then runs seed.migrate_indexes on the
+scratch table, measures again and prints both side by side. The scratch
+table is dropped at the end; user_data itself is only read.
+
+Usage: ./index_benchmark.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+import time
+seed = __import__('seed')
+
+SCRATCH = 'user_data_index_bench'
+LEGACY_TABLE = (
+    f"CREATE TABLE {SCRATCH} ("
+    "  user_id CHAR(36) PRIMARY KEY,"
+    "  name VARCHAR(255) NOT NULL,"
+    "  email VARCHAR(255) NOT NULL,"
+    "  age DECIMAL(5,2) NOT NULL,"
+    "  updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),"
+    "  INDEX(user_id)"
+    ") ENGINE=InnoDB"
+)
+
+
+def workloads(cursor):
+    """(label, sql, params) for the queries worth comparing."""
+    cursor.execute(f"SELECT email FROM {SCRATCH} ORDER BY user_id LIMIT 100")
+    emails = [email for (email,) in cursor.fetchall()] or ['']
+    placeholders = ", ".join(["%s"] * len(emails))
+    return [
+        ("age scan", f"SELECT age FROM {SCRATCH}", ()),
+        ("average age", f"SELECT AVG(age) FROM {SCRATCH}", ()),
+        ("age > 25 keyset page",
+         f"SELECT user_id, age FROM {SCRATCH} WHERE age > %s "
+         "ORDER BY user_id LIMIT 1000", (25,)),
+        ("age range", f"SELECT user_id, age FROM {SCRATCH} "
+                      "WHERE age BETWEEN %s AND %s", (30, 40)),
+        ("email lookup", f"SELECT user_id FROM {SCRATCH} "
+                         f"WHERE email IN ({placeholders})", tuple(emails)),
+    ]
+
+
+def measure(cursor, sql, params, repeat):
+    """Best wall time over repeat runs and the EXPLAIN of the query."""
+    cursor.execute("EXPLAIN " + sql, params)
+    names = [column[0] for column in cursor.description]
+    plan = dict(zip(names, cursor.fetchone()))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        best = min(best, time.perf_counter() - start)
+    return {
+        'seconds': best,
+        'key': plan.get('key'),
+        'rows': plan.get('rows'),
+        'extra': plan.get('Extra'),
+    }
+
+
+def run(rows=None, repeat=3):
+    """Measure every workload on the old and the migrated schema."""
+    connection = seed.connect_to_prodev()
+    results = {}
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {SCRATCH}")
+        cursor.execute(LEGACY_TABLE)
+        copy = (f"INSERT INTO {SCRATCH} "
+                "SELECT user_id, name, email, age, updated_at FROM user_data")
+        if rows:
+            cursor.execute(copy + " ORDER BY user_id LIMIT %s", (rows,))
+        else:
+            cursor.execute(copy)
+        connection.commit()
+        cursor.execute(f"ANALYZE TABLE {SCRATCH}")
+        cursor.fetchall()
+
+        cases = workloads(cursor)
+        for label, sql, params in cases:
+            results[label] = {'before': measure(cursor, sql, params, repeat)}
+        seed.migrate_indexes(connection, SCRATCH)
+        cursor.execute(f"ANALYZE TABLE {SCRATCH}")
+        cursor.fetchall()
+        for label, sql, params in cases:
+            results[label]['after'] = measure(cursor, sql, params, repeat)
+    finally:
+        try:
+            cleanup = connection.cursor()
+            cleanup.execute(f"DROP TABLE IF EXISTS {SCRATCH}")
+            cleanup.close()
+        finally:
+            connection.close()
+    return results
+
+
+def print_results(results):
+    print(f"{'workload':<22} {'before':>10} {'after':>10} {'speedup':>8}  "
+          "index before -> after")
+    for label, result in results.items():
+        before, after = result['before'], result['after']
+        speedup = (before['seconds'] / after['seconds']
+                   if after['seconds'] else float('inf'))
+        covering = 'Using index' in (after['extra'] or '').split('; ')
+        print(f"{label:<22} {before['seconds'] * 1000:>8.1f}ms "
+              f"{after['seconds'] * 1000:>8.1f}ms {speedup:>7.1f}x  "
+              f"{before['key'] or 'full scan'} -> "
+              f"{after['key'] or 'full scan'}"
+              f"{' (covering)' if covering else ''}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int,
+                        help="copy at most this many user_data rows")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print_results(run(args.rows, args.repeat))
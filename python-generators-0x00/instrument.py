@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+"""Opt-in throughput and lag metrics for the streaming generators.
+
+stream_users, stream_users_in_batches, batch_processing and
+lazy_pagination take a metrics=StreamMetrics() argument. While they run
+it adds up:
+
+- rows and batches fetched, and the bytes they take in memory (estimated
+  with adaptive.batch_bytes);
+- db_seconds: time spent in database fetches, with the latency of the
+  last, slowest and average batch;
+- stall_seconds: time the consumer spent waiting for the next batch.
+  Without prefetching this is the fetch time itself; with a prefetching
+  PageFetcher it is only the time the consumer found the queue empty;
+- consumer_seconds: time the generator sat suspended while the consumer
+  worked on what it had been given;
+- queue depth: prefetched pages waiting when the consumer asked for one.
+
+If stall time dominates, the database is the limit; if consumer time
+dominates, the consumer is. snapshot() returns all of this with rows/s
+as a dict, and on_batch, if given, is called with a snapshot after every
+batch:
+
+    metrics = StreamMetrics(on_batch=print_metrics)
+    for user in stream_users(metrics=metrics):
+        ...
+    print(metrics.bottleneck())
+"""
+import sys
+import threading
+import time
+from adaptive import batch_bytes
+
+
+class StreamMetrics:
+    """Thread-safe counters filled in by an instrumented generator."""
+
+    def __init__(self, on_batch=None):
+        self.on_batch = on_batch
+        self._lock = threading.Lock()
+        self.started = None
+        self.rows = 0
+        self.batches = 0
+        self.bytes_fetched = 0
+        self.db_seconds = 0.0
+        self.last_batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+        self.stall_seconds = 0.0
+        self.consumer_seconds = 0.0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def fetched(self, batch, seconds, stalled=True):
+        """Record a batch that took seconds to fetch from the database.
+
+        stalled says whether the consumer waited for it, which is the
+        case unless it was fetched ahead on another thread.
+        """
+        with self._lock:
+            if self.started is None:
+                self.started = time.perf_counter() - seconds
+            self.rows += len(batch)
+            self.batches += 1
+            self.bytes_fetched += batch_bytes(batch)
+            self.db_seconds += seconds
+            self.last_batch_seconds = seconds
+            self.max_batch_seconds = max(self.max_batch_seconds, seconds)
+            if stalled:
+                self.stall_seconds += seconds
+        if self.on_batch is not None:
+            self.on_batch(self.snapshot())
+
+    def stalled(self, seconds, queue_depth):
+        """Record a wait for a prefetched batch and the queue depth seen."""
+        with self._lock:
+            self.stall_seconds += seconds
+            self.queue_depth = queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def consumed(self, seconds):
+        """Record time the generator spent waiting on its consumer."""
+        with self._lock:
+            self.consumer_seconds += seconds
+
+    def bottleneck(self):
+        """'database' or 'consumer', whichever the stream waited on more."""
+        if self.stall_seconds >= self.consumer_seconds:
+            return 'database'
+        return 'consumer'
+
+    def snapshot(self):
+        """The current counters plus rows/s and mean batch latency."""
+        with self._lock:
+            elapsed = (time.perf_counter() - self.started
+                       if self.started is not None else 0.0)
+            return {
+                'rows': self.rows,
+                'batches': self.batches,
+                'bytes_fetched': self.bytes_fetched,
+                'elapsed': elapsed,
+                'rows_per_second': self.rows / elapsed if elapsed else 0.0,
+                'db_seconds': self.db_seconds,
+                'last_batch_seconds': self.last_batch_seconds,
+                'max_batch_seconds': self.max_batch_seconds,
+                'mean_batch_seconds': (self.db_seconds / self.batches
+                                       if self.batches else 0.0),
+                'stall_seconds': self.stall_seconds,
+                'consumer_seconds': self.consumer_seconds,
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+            }
+
+
+def print_metrics(snapshot):
+    """Ready-made on_batch callback: one summary line on stderr."""
+    print(f"{snapshot['rows']} rows, "
+          f"{snapshot['rows_per_second']:.0f} rows/s, "
+          f"{snapshot['bytes_fetched'] / 1e6:.1f} MB, "
+          f"batch {snapshot['last_batch_seconds'] * 1000:.1f}ms, "
+          f"stalled {snapshot['stall_seconds']:.2f}s, "
+          f"consumer {snapshot['consumer_seconds']:.2f}s, "
+          f"queue {snapshot['queue_depth']}", file=sys.stderr)
+
+
+def observe(batches, metrics):
+    """Pass batches through, timing each one's arrival as a fetch.
+
+    The time spent suspended at each yield counts as consumer time. For
+    sources whose database calls cannot be timed directly.
+    """
+    iterator = iter(batches)
+    while True:
+        start = time.perf_counter()
+        batch = next(iterator, None)
+        if batch is None:
+            return
+        metrics.fetched(batch, time.perf_counter() - start)
+        start = time.perf_counter()
+        yield batch
+        metrics.consumed(time.perf_counter() - start)
@@ -0,0 +1,185 @@
+#!/usr/bin/python3
+"""Composable generator pipelines with optional threaded and process stages.
+
+A Pipeline starts from any iterable (usually one of the user_data
+generators) and chains source, map, filter, batch and window stages:
+
+    stream_users = __import__('0-stream_users').stream_users
+    adults = (Pipeline(stream_users(), mode='thread')
+              .filter(lambda user: user['age'] > 25)
+              .map(score_user, mode='process', workers=4)
+              .batch(500))
+    for batch in adults:
+        ...
+
+Stages with no mode run inline, like hand-nested generators. A 'thread'
+stage runs in a thread of its own and a 'process' stage fans its
+function out to a process pool. Between those stages sits a bounded
+queue of queue_size items, so I/O-bound fetching and CPU-bound work
+overlap while memory stays bounded. Pooled stages keep the input order.
+Functions given to process stages must be picklable, which rules out
+lambdas.
+"""
+import itertools
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+_DONE = object()
+MODES = (None, 'thread', 'process')
+
+
+class _Failure:
+    """Carries an exception from a stage thread to the consumer."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _threaded(iterable, queue_size):
+    """Drain iterable on a background thread through a bounded queue."""
+    items = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def run():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                put(item)
+                if stop.is_set():
+                    break
+        except Exception as err:
+            put(_Failure(err))
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+        put(_DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _pooled(iterable, func, executor, max_pending):
+    """Yield (item, func(item)) in input order from an executor."""
+    pending = deque()
+    with executor:
+        for item in iterable:
+            if len(pending) >= max_pending:
+                done_item, future = pending.popleft()
+                yield done_item, future.result()
+            pending.append((item, executor.submit(func, item)))
+        while pending:
+            done_item, future = pending.popleft()
+            yield done_item, future.result()
+
+
+def _batched(iterable, size):
+    """Yield lists of up to size items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _windowed(iterable, size, step):
+    """Yield tuples of size consecutive items, step items apart."""
+    window = deque(maxlen=size)
+    skip = 0
+    for item in iterable:
+        window.append(item)
+        if len(window) < size:
+            continue
+        if skip:
+            skip -= 1
+            continue
+        yield tuple(window)
+        skip = step - 1
+
+
+class Pipeline:
+    """A chain of generator stages over a source iterable."""
+
+    def __init__(self, source, mode=None, queue_size=16):
+        if mode not in (None, 'thread'):
+            raise ValueError("A source can only run inline or in a thread")
+        self.source = source
+        self.stages = []
+        if mode == 'thread':
+            self.stages.append(lambda items: _threaded(items, queue_size))
+
+    def _add(self, func, collect, mode, workers, queue_size):
+        """Append a map-like stage.
+
+        collect turns the stage's (item, func(item)) pairs into its output.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown stage mode: {mode}")
+
+        if mode == 'process' or workers > 1:
+            executor = (ProcessPoolExecutor if mode == 'process'
+                        else ThreadPoolExecutor)
+
+            def stage(items):
+                return collect(_pooled(items, func, executor(workers),
+                                       queue_size))
+        else:
+            def stage(items):
+                return collect((item, func(item)) for item in items)
+
+        if mode is None:
+            self.stages.append(stage)
+        else:
+            self.stages.append(
+                lambda items: _threaded(stage(items), queue_size)
+            )
+        return self
+
+    def map(self, func, mode=None, workers=1, queue_size=16):
+        """Apply func to every item."""
+        def collect(pairs):
+            return (result for _, result in pairs)
+        return self._add(func, collect, mode, workers, queue_size)
+
+    def filter(self, predicate, mode=None, workers=1, queue_size=16):
+        """Keep the items for which predicate returns true."""
+        def collect(pairs):
+            return (item for item, keep in pairs if keep)
+        return self._add(predicate, collect, mode, workers, queue_size)
+
+    def batch(self, size):
+        """Group items into lists of up to size items."""
+        self.stages.append(lambda items: _batched(items, size))
+        return self
+
+    def window(self, size, step=1):
+        """Yield tuples of size consecutive items, moving step at a time."""
+        self.stages.append(lambda items: _windowed(items, size, step))
+        return self
+
+    def __iter__(self):
+        items = self.source
+        for stage in self.stages:
+            items = stage(items)
+        return iter(items)
@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""Small SELECT builder for the user_data streaming generators.
+
+Column lists and filters given here are pushed into the SQL sent to
+MySQL, so rows and columns the caller does not need never cross the wire.
+Predicates that SQL cannot express can still be added with filter(); they
+run in Python on every fetched row as a fallback.
+"""
+seed = __import__('seed')
+from rows import convert_rows
+
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'LIKE', 'IN')
+
+
+def _after(keys, values):
+    """Condition selecting rows whose (keys) sort after (values).
+
+    Spelled out as `k1 > v1 OR (k1 = v1 AND k2 > v2) ...` rather than a
+    row comparison, so MySQL can turn it into an index range scan.
+    """
+    branches = []
+    params = []
+    for depth in range(len(keys)):
+        terms = [f"{column} = %s" for column in keys[:depth]]
+        terms.append(f"{keys[depth]} > %s")
+        branches.append(" AND ".join(terms))
+        params.extend(values[:depth + 1])
+    if len(branches) == 1:
+        return branches[0], params
+    clause = " OR ".join(f"({branch})" for branch in branches)
+    return f"({clause})", params
+
+
+class Query:
+    """Columns, SQL conditions and Python predicates for one user_data scan."""
+
+    def __init__(self, columns=None):
+        self.columns = None
+        self.conditions = []
+        self.params = []
+        self.predicates = []
+        if columns is not None:
+            self.select(*columns)
+
+    def select(self, *columns):
+        """Only fetch the given columns instead of SELECT *."""
+        self.columns = tuple(seed.check_column(column) for column in columns)
+        return self
+
+    def where(self, column, op, value):
+        """Push `column op value` into the WHERE clause."""
+        seed.check_column(column)
+        op = op.upper()
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator: {op}")
+        if op == 'IN':
+            values = tuple(value)
+            if not values:
+                self.conditions.append("1 = 0")
+                return self
+            placeholders = ", ".join(["%s"] * len(values))
+            self.conditions.append(f"{column} IN ({placeholders})")
+            self.params.extend(values)
+        else:
+            self.conditions.append(f"{column} {op} %s")
+            self.params.append(value)
+        return self
+
+    def where_sql(self, clause, params=()):
+        """Push a raw SQL condition using %s placeholders for its params."""
+        self.conditions.append(f"({clause})")
+        self.params.extend(params)
+        return self
+
+    def filter(self, predicate):
+        """Add a Python predicate on row dicts for what SQL can't express."""
+        self.predicates.append(predicate)
+        return self
+
+    def copy(self):
+        """Return an independent copy that can be extended separately."""
+        other = Query()
+        other.columns = self.columns
+        other.conditions = list(self.conditions)
+        other.params = list(self.params)
+        other.predicates = list(self.predicates)
+        return other
+
+    def sql(self, key=None, after=None, limit=None, offset=None):
+        """Return the (statement, params) pair for this query.
+
+        key orders the result; with after set only rows whose key sorts
+        after it are selected, which turns the query into a keyset seek.
+        key may also be a tuple of columns (with after a tuple of values)
+        for a composite, lexicographically ordered key. Key columns are
+        always selected so callers can read them back.
+        """
+        keys = () if key is None else (key,) if isinstance(key, str) else key
+        keys = tuple(seed.check_column(column) for column in keys)
+        if self.columns is None:
+            select = "*"
+        else:
+            columns = self.columns
+            columns += tuple(key for key in keys if key not in columns)
+            select = ", ".join(columns)
+
+        conditions = list(self.conditions)
+        params = list(self.params)
+        if keys and after is not None:
+            if len(keys) == 1:
+                after = (after,)
+            clause, after_params = _after(keys, after)
+            conditions.append(clause)
+            params.extend(after_params)
+
+        statement = f"SELECT {select} FROM user_data"
+        if conditions:
+            statement += " WHERE " + " AND ".join(conditions)
+        if keys:
+            statement += f" ORDER BY {', '.join(keys)}"
+        if limit is not None:
+            statement += " LIMIT %s"
+            params.append(limit)
+            if offset:
+                statement += " OFFSET %s"
+                params.append(offset)
+        return statement, tuple(params)
+
+    def matches(self, row):
+        """Return True if row passes every Python-side predicate."""
+        return all(predicate(row) for predicate in self.predicates)
+
+    def apply(self, rows):
+        """Filter a fetched list of rows with the Python-side predicates."""
+        if not self.predicates:
+            return rows
+        return [row for row in rows if self.matches(row)]
+
+    def apply_tuples(self, names, rows, row_format='tuple'):
+        """Filter fetched row tuples, then convert them to row_format.
+
+        Predicates are given each row as a dict of names, whatever
+        row_format the caller asked for.
+        """
+        if self.predicates:
+            rows = [row for row in rows
+                    if self.matches(dict(zip(names, row)))]
+        return convert_rows(names, rows, row_format)
@@ -0,0 +1,63 @@
+#!/usr/bin/python3
+"""Compact row types for the streaming generators.
+
+The default 'dict' rows repeat every column name in a fresh dict per row.
+The other formats are built from the cursor's plain tuples instead:
+
+- 'tuple': the tuples themselves, with no per-row work at all.
+- 'namedtuple': a namedtuple class created once per column list.
+- 'record': a __slots__ class created once per column list.
+
+Both class-based formats keep attribute access (row.age) readable.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+ROW_FORMATS = ('dict', 'tuple', 'namedtuple', 'record')
+
+
+def check_row_format(row_format):
+    """Make sure row_format is one of ROW_FORMATS."""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"Unknown row format: {row_format}")
+    return row_format
+
+
+@lru_cache(maxsize=None)
+def record_class(names):
+    """Return a __slots__ class with one attribute per column name."""
+    def __init__(self, *values):
+        for name, value in zip(names, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in names)
+        return f"UserRecord({values})"
+
+    return type('UserRecord', (), {
+        '__slots__': names,
+        '__init__': __init__,
+        '__repr__': __repr__,
+    })
+
+
+@lru_cache(maxsize=None)
+def row_factory(names, row_format):
+    """Return the callable that turns one row tuple into row_format."""
+    check_row_format(row_format)
+    if row_format == 'namedtuple':
+        return namedtuple('UserRow', names)._make
+    if row_format == 'record':
+        cls = record_class(names)
+        return lambda row: cls(*row)
+    if row_format == 'dict':
+        return lambda row: dict(zip(names, row))
+    return None
+
+
+def convert_rows(names, rows, row_format):
+    """Convert a list of row tuples with column names into row_format."""
+    make = row_factory(tuple(names), row_format)
+    if make is None:
+        return rows
+    return [make(row) for row in rows]
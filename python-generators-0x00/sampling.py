@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+"""Sampling generators and approximate answers over user_data.
+
+- reservoir_sample keeps a uniform sample of k items from any stream in
+  O(k) memory.
+- bernoulli_sample_users pushes `RAND() < fraction` into the SQL, so
+  only the sampled rows cross the wire. The server still reads every row.
+- block_sample_users seeks to random points of the user_id key space and
+  reads a short run of rows from each. This touches only the sampled rows
+  and is the one to use for interactive queries. user_id is a uuid4, so
+  neighbouring keys are unrelated users.
+
+approximate_average_age turns a sample into a mean with a normal-
+approximation confidence interval.
+"""
+import itertools
+import math
+import random
+import statistics
+seed = __import__('seed')
+stream_users = __import__('0-stream_users')
+from query import Query
+import stats
+
+_END = object()
+
+
+def reservoir_sample(iterable, k, rng=None):
+    """Return a uniform random sample of k items (Li's Algorithm L)."""
+    if k < 0:
+        raise ValueError("Sample size must not be negative")
+    if k == 0:
+        return []
+    rng = rng or random.Random()
+    iterator = iter(iterable)
+    sample = []
+    for item in iterator:
+        sample.append(item)
+        if len(sample) == k:
+            break
+    else:
+        return sample
+
+    weight = math.exp(math.log(rng.random()) / k)
+    while True:
+        skip = math.floor(math.log(rng.random()) / math.log(1 - weight))
+        item = next(itertools.islice(iterator, skip, None), _END)
+        if item is _END:
+            return sample
+        sample[rng.randrange(k)] = item
+        weight *= math.exp(math.log(rng.random()) / k)
+
+
+def bernoulli_sample_users(fraction, query=None, chunk_size=1000):
+    """Generator of user_data rows, each kept with probability fraction."""
+    query = (query or Query()).copy().where_sql("RAND() < %s", (fraction,))
+    return stream_users.stream_users(chunk_size, query)
+
+
+def block_sample_users(blocks, block_size=10, query=None, rng=None):
+    """Generator of rows read from `blocks` random points of the key space.
+
+    Each block is one indexed seek (user_id >= a random prefix) followed
+    by block_size rows in key order, all over a single connection. Rows
+    seen by two blocks are yielded once.
+    """
+    rng = rng or random.Random()
+    query = query or Query()
+    seen = set()
+    connection = seed.connect_to_prodev()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        for _ in range(blocks):
+            start = f"{rng.getrandbits(32):08x}"
+            block = query.copy().where_sql("user_id >= %s", (start,))
+            cursor.execute(*block.sql('user_id', limit=block_size))
+            for row in block.apply(cursor.fetchall()):
+                if row['user_id'] not in seen:
+                    seen.add(row['user_id'])
+                    yield row
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def approximate_average_age(sample_size=1000, confidence=0.95,
+                            method='block', fraction=None):
+    """Estimate the average age from a sample.
+
+    method 'block' reads about sample_size rows through random key seeks
+    and 'bernoulli' keeps each row with probability fraction, which
+    defaults to sample_size over the row count in user_data_stats.
+    Returns a dict with the estimate, the confidence interval and the
+    sample size.
+    """
+    query = Query(['user_id', 'age'])
+    if method == 'block':
+        block_size = 10
+        blocks = max(1, math.ceil(sample_size / block_size))
+        rows = block_sample_users(blocks, block_size, query)
+    elif method == 'bernoulli':
+        if fraction is None:
+            connection = seed.connect_to_prodev()
+            try:
+                count = stats.read_stats(connection)['count']
+            finally:
+                connection.close()
+            fraction = min(1.0, sample_size / count) if count else 1.0
+        if not 0 < fraction <= 1:
+            raise ValueError(f"Sampling fraction must be in (0, 1]: "
+                             f"{fraction}")
+        rows = bernoulli_sample_users(fraction, query)
+    else:
+        raise ValueError(f"Unknown sampling method: {method}")
+
+    ages = [float(row['age']) for row in rows]
+    if not ages:
+        return {'estimate': None, 'low': None, 'high': None, 'sample': 0}
+    mean = statistics.fmean(ages)
+    if len(ages) > 1:
+        z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        margin = z * statistics.stdev(ages) / math.sqrt(len(ages))
+    else:
+        margin = math.inf
+    return {
+        'estimate': mean,
+        'low': mean - margin,
+        'high': mean + margin,
+        'sample': len(ages),
+    }
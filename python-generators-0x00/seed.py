@@ -2,16 +2,37 @@
 import mysql.connector
 from mysql.connector import errorcode
 import csv
+import itertools
+import time
 import uuid
+from connection_pool import ConnectionPool
+import parallel_csv
+import stats
+
+USER_DATA_COLUMNS = ('user_id', 'name', 'email', 'age', 'updated_at')
+
+
+def check_column(column):
+    """Make sure column is a user_data column before it is put in SQL."""
+    if column not in USER_DATA_COLUMNS:
+        raise ValueError(f"Unknown user_data column: {column}")
+    return column
+
+
+PRODEV_CONFIG = {
+    'host': "localhost",
+    'user': "root",
+    'password': "your_mysql_password",  # replace with your password
+    'database': "ALX_prodev",
+}
+
 
 def connect_db():
     """Connect to MySQL server."""
     try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="your_mysql_password"  # replace with your password
-        )
+        server = {name: value for name, value in PRODEV_CONFIG.items()
+                  if name != 'database'}
+        connection = mysql.connector.connect(**server)
         return connection
     except mysql.connector.Error as err:
         print(f"Error: {err}")
@@ -29,23 +50,41 @@ def create_database(connection):
     cursor.close()
 
 
+def _open_prodev():
+    return mysql.connector.connect(**PRODEV_CONFIG)
+
+
+prodev_pool = ConnectionPool(_open_prodev)
+
+
 def connect_to_prodev():
-    """Connect to the ALX_prodev database."""
-    try:
-        connection = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="your_mysql_password",  # replace with your password
-            database="ALX_prodev"
-        )
-        return connection
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        return None
+    """Check out a connection to the ALX_prodev database.
+
+    Connections come from the shared prodev_pool (see connection_pool.py);
+    close() returns them to the pool instead of disconnecting. Every
+    generator gets its connection here, so failures are raised rather
+    than returned as None: mysql.connector.Error when the server cannot
+    be reached, PoolError when no connection frees up in time.
+    """
+    return prodev_pool.checkout()
+
+
+USER_DATA_INDEXES = {
+    # name: (columns, unique)
+    'uq_user_data_email': (('email',), True),
+    'idx_user_data_age': (('age', 'user_id'), False),
+    'idx_user_data_updated': (('updated_at', 'user_id'), False),
+}
 
 
 def create_table(connection):
-    """Create user_data table if it does not exist."""
+    """Create user_data table if it does not exist.
+
+    Besides the primary key, the table gets the indexes the access paths
+    need (USER_DATA_INDEXES): a unique email index for the seeding
+    dedupe, (age, user_id) so age-filtered and age-only scans are served
+    from the index alone, and (updated_at, user_id) for change streams.
+    """
     TABLES = {}
     TABLES['user_data'] = (
         "CREATE TABLE IF NOT EXISTS user_data ("
@@ -53,7 +92,11 @@ def create_table(connection):
         "  name VARCHAR(255) NOT NULL,"
         "  email VARCHAR(255) NOT NULL,"
         "  age DECIMAL(5,2) NOT NULL,"
-        "  INDEX(user_id)"
+        "  updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)"
+        "    ON UPDATE CURRENT_TIMESTAMP(6),"
+        "  UNIQUE KEY uq_user_data_email (email),"
+        "  INDEX idx_user_data_age (age, user_id),"
+        "  INDEX idx_user_data_updated (updated_at, user_id)"
         ") ENGINE=InnoDB"
     )
 
@@ -65,28 +108,137 @@ def create_table(connection):
     except mysql.connector.Error as err:
         print(f"Error creating table: {err}")
     cursor.close()
+    ensure_change_tracking(connection)
+    migrate_indexes(connection)
+    stats.create_stats(connection)
 
 
-def insert_data(connection, csv_file):
-    """Insert user data from CSV file if not already in database."""
+def migrate_indexes(connection, table='user_data'):
+    """Bring the indexes of an existing user_data table up to date in place.
+
+    Adds any index of USER_DATA_INDEXES whose columns are not indexed yet,
+    and drops secondary indexes that only repeat the primary key (the old
+    schema's INDEX(user_id)). All changes go in a single ALTER TABLE.
+    """
     cursor = connection.cursor()
+    cursor.execute(
+        "SELECT index_name, non_unique, column_name "
+        "FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s "
+        "ORDER BY index_name, seq_in_index",
+        (table,)
+    )
+    existing = {}
+    for name, non_unique, column in cursor.fetchall():
+        columns, unique = existing.get(name, ((), not non_unique))
+        existing[name] = (columns + (column,), unique)
 
-    with open(csv_file, mode='r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            user_id = str(uuid.uuid4())
-            query = "SELECT COUNT(*) FROM user_data WHERE email = %s"
-            cursor.execute(query, (row['email'],))
-            exists = cursor.fetchone()[0]
-
-            if not exists:
-                insert_query = (
-                    "INSERT INTO user_data (user_id, name, email, age) "
-                    "VALUES (%s, %s, %s, %s)"
-                )
-                values = (user_id, row['name'], row['email'], float(row['age']))
-                cursor.execute(insert_query, values)
+    changes = []
+    primary = existing.get('PRIMARY', ((), True))[0]
+    for name, (columns, unique) in existing.items():
+        if name != 'PRIMARY' and columns == primary:
+            changes.append(f"DROP INDEX `{name}`")
+    for name, (columns, unique) in USER_DATA_INDEXES.items():
+        if (columns, unique) in existing.values():
+            continue
+        kind = "UNIQUE KEY" if unique else "INDEX"
+        changes.append(f"ADD {kind} {name} ({', '.join(columns)})")
+
+    if changes:
+        try:
+            cursor.execute(f"ALTER TABLE {table} {', '.join(changes)}")
+            print(f"Indexes of {table} updated: {'; '.join(changes)}")
+        except mysql.connector.Error as err:
+            print(f"Error updating indexes: {err}")
+    cursor.close()
+
+
+def ensure_change_tracking(connection):
+    """Add updated_at to a user_data table created without it.
+
+    Existing rows get the time of the migration, so the first change
+    stream after it sees every row once. Its index is added by
+    migrate_indexes.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = 'user_data' "
+        "AND column_name = 'updated_at'"
+    )
+    if not cursor.fetchone()[0]:
+        try:
+            cursor.execute(
+                "ALTER TABLE user_data "
+                "ADD COLUMN updated_at TIMESTAMP(6) NOT NULL "
+                "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)"
+            )
+            print("Change tracking added to user_data")
+        except mysql.connector.Error as err:
+            print(f"Error adding change tracking: {err}")
+    cursor.close()
+
+
+def insert_data(connection, csv_file, batch_size=1000, workers=None):
+    """Bulk insert user data from CSV file, skipping emails already present.
+
+    Rows go to the server batch_size at a time through executemany, which
+    mysql.connector rewrites into a single multi-row INSERT. The unique
+    email index turns duplicates into no-ops, so reseeding is idempotent,
+    and every batch is committed on its own. With workers set, the CSV is
+    parsed on that many cores by parallel_csv while batches are loaded.
+    The stats tables get one update per batch (see stats.defer_stats),
+    not one per row.
+    """
+    insert_query = (
+        "INSERT INTO user_data (user_id, name, email, age) "
+        "VALUES (%s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE user_id = user_id"
+    )
+    cursor = connection.cursor()
+    start = time.perf_counter()
+    read = inserted = 0
+
+    if workers:
+        rows = itertools.chain.from_iterable(
+            parallel_csv.parse_csv_parallel(csv_file, workers)
+        )
+    else:
+        rows = read_csv_rows(csv_file)
+    try:
+        while True:
+            batch = list(itertools.islice(rows, batch_size))
+            if not batch:
+                break
+            inserted += _insert_batch(connection, cursor, insert_query, batch)
+            read += len(batch)
+    finally:
+        # Session variables outlive this call on a pooled connection.
+        stats.end_deferred(cursor)
 
-    connection.commit()
     cursor.close()
+    elapsed = time.perf_counter() - start
+    rate = read / elapsed if elapsed else 0
     print("Data inserted successfully")
+    print(f"{read} rows read, {inserted} inserted in {elapsed:.2f}s "
+          f"({rate:.0f} rows/s)")
+    return inserted
+
+
+def read_csv_rows(csv_file):
+    """Generator that yields user_data row tuples from CSV file on one core."""
+    with open(csv_file, mode='r', newline='') as file:
+        for row in csv.DictReader(file):
+            yield (str(uuid.uuid4()), row['name'], row['email'],
+                   float(row['age']))
+
+
+def _insert_batch(connection, cursor, insert_query, batch):
+    """Insert one batch of row tuples and commit it; return rows added."""
+    stats.defer_stats(cursor)
+    cursor.executemany(insert_query, batch)
+    # Duplicate emails hit the no-op update and count as 0 affected rows.
+    added = cursor.rowcount
+    stats.apply_deferred(cursor)
+    connection.commit()
+    return added
@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+"""SQLite stand-in for the parts of mysql.connector the generators use.
+
+connect() returns a connection whose cursors accept the same arguments
+as mysql.connector cursors (dictionary=, buffered=) and the same %s
+placeholders, so the streaming generators can run unchanged against a
+local SQLite file for benchmarks, copies and tests. MySQL-only SQL such
+as CRC32() or ON DUPLICATE KEY is not translated.
+
+create_users and serving_prodev set up a small table and point
+seed.connect_to_prodev at it for tests.
+"""
+import contextlib
+import sqlite3
+from decimal import Decimal
+
+# MySQL DECIMAL columns come back as Decimal, which sqlite3 cannot bind.
+sqlite3.register_adapter(Decimal, str)
+
+CREATE_USER_DATA = (
+    "CREATE TABLE IF NOT EXISTS user_data ("
+    "  user_id CHAR(36) PRIMARY KEY,"
+    "  name VARCHAR(255) NOT NULL,"
+    "  email VARCHAR(255) NOT NULL UNIQUE,"
+    "  age DECIMAL(5,2) NOT NULL,"
+    "  updated_at TIMESTAMP NOT NULL"
+    "    DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+    ")"
+)
+
+
+class Cursor:
+    """mysql.connector-style cursor over a sqlite3 cursor."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, operation, params=()):
+        self._cursor.execute(operation.replace('%s', '?'), tuple(params))
+
+    def executemany(self, operation, seq_params):
+        self._cursor.executemany(operation.replace('%s', '?'), seq_params)
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def _rows(self, rows):
+        if not self.dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchmany(self, size=1):
+        return self._rows(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """mysql.connector-style connection over a sqlite3 connection."""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return Cursor(self._connection.cursor(), dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._connection.close()
+
+
+def connect(path):
+    """Open the SQLite file at path as a mysql.connector-like connection."""
+    return Connection(path)
+
+
+def create_table(connection):
+    """Create user_data with the same columns as seed.create_table.
+
+    updated_at defaults to the insert time, to the millisecond, but
+    SQLite has no ON UPDATE: writers must set it when they change a row.
+    """
+    cursor = connection.cursor()
+    cursor.execute(CREATE_USER_DATA)
+    connection.commit()
+    cursor.close()
+
+
+def create_users(path, count):
+    """Create user_data at path with count synthetic users.
+
+    User i has user_id id-00i and age 18 + i. The rows go in with their
+    keys descending, so nothing relies on insertion order. Returns the
+    user_ids in key order.
+    """
+    ids = [f"id-{i:03d}" for i in range(count)]
+    connection = connect(path)
+    create_table(connection)
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO user_data (user_id, name, email, age) "
+        "VALUES (%s, %s, %s, %s)",
+        [(user_id, f"User {i}", f"user{i}@example.com", 18 + i)
+         for i, user_id in reversed(list(enumerate(ids)))])
+    connection.commit()
+    connection.close()
+    return ids
+
+
+@contextlib.contextmanager
+def serving_prodev(path):
+    """Point seed.connect_to_prodev at the SQLite file at path.
+
+    Yields the list of connections opened so far, so callers can count
+    the round trips a generator makes.
+    """
+    seed = __import__('seed')
+    original = seed.connect_to_prodev
+    opened = []
+
+    def connect_to_prodev():
+        connection = connect(path)
+        opened.append(connection)
+        return connection
+
+    seed.connect_to_prodev = connect_to_prodev
+    try:
+        yield opened
+    finally:
+        seed.connect_to_prodev = original
@@ -0,0 +1,278 @@
+#!/usr/bin/python3
+"""Incrementally maintained summary statistics for user_data.
+
+user_data_stats holds one summary row (count, sum, sum of squares,
+min and max of age). user_data_age_histogram holds one row per 10-year
+age bucket. Both tables are kept current by triggers on user_data, so
+every insert through seed.insert_data (or anywhere else) updates them in
+the same transaction. Common aggregates then become O(1) reads instead
+of full scans.
+
+Updating the single summary row for every inserted row would cost two
+extra writes per row, and all writers would queue on that row's lock.
+Bulk loaders therefore call defer_stats() before each batch. The
+triggers then only add the batch's rows to session variables, and
+apply_deferred() writes the whole batch to the tables in one statement
+per table before the commit. seed.insert_data works this way.
+
+Deletes and updates keep count, sums and buckets exact, but cannot tell
+what the new min or max is. Run `./stats.py rebuild` to recompute
+everything from user_data if that, or any other drift, matters.
+"""
+import sys
+from collections import Counter
+from decimal import Decimal
+import mysql.connector
+
+BUCKET_WIDTH = 10
+DEFERRED = '@user_data_stats_deferred'
+
+TABLES = {
+    'user_data_stats': (
+        "CREATE TABLE IF NOT EXISTS user_data_stats ("
+        "  id TINYINT PRIMARY KEY,"
+        "  row_count BIGINT NOT NULL,"
+        "  age_sum DECIMAL(24,2) NOT NULL,"
+        "  age_sum_sq DECIMAL(30,4) NOT NULL,"
+        "  age_min DECIMAL(5,2) NULL,"
+        "  age_max DECIMAL(5,2) NULL"
+        ") ENGINE=InnoDB"
+    ),
+    'user_data_age_histogram': (
+        "CREATE TABLE IF NOT EXISTS user_data_age_histogram ("
+        "  bucket SMALLINT PRIMARY KEY,"
+        "  row_count BIGINT NOT NULL"
+        ") ENGINE=InnoDB"
+    ),
+}
+
+
+def _add_row(age):
+    """SQL statements that add one age to the summary and histogram."""
+    return (
+        "INSERT INTO user_data_stats "
+        "(id, row_count, age_sum, age_sum_sq, age_min, age_max) "
+        f"VALUES (1, 1, {age}, {age} * {age}, {age}, {age}) "
+        "ON DUPLICATE KEY UPDATE row_count = row_count + 1, "
+        f"age_sum = age_sum + {age}, "
+        f"age_sum_sq = age_sum_sq + {age} * {age}, "
+        f"age_min = LEAST(COALESCE(age_min, {age}), {age}), "
+        f"age_max = GREATEST(COALESCE(age_max, {age}), {age}); "
+        "INSERT INTO user_data_age_histogram (bucket, row_count) "
+        f"VALUES (FLOOR({age} / {BUCKET_WIDTH}), 1) "
+        "ON DUPLICATE KEY UPDATE row_count = row_count + 1;"
+    )
+
+
+def _remove_row(age):
+    """SQL statements that take one age out of the summary and histogram."""
+    return (
+        "UPDATE user_data_stats SET row_count = row_count - 1, "
+        f"age_sum = age_sum - {age}, "
+        f"age_sum_sq = age_sum_sq - {age} * {age} WHERE id = 1; "
+        "UPDATE user_data_age_histogram SET row_count = row_count - 1 "
+        f"WHERE bucket = FLOOR({age} / {BUCKET_WIDTH});"
+    )
+
+
+def _defer_row(age):
+    """SQL statement that adds one age to the session's pending delta."""
+    return (
+        "SET @user_data_stats_rows = @user_data_stats_rows + 1, "
+        f"@user_data_stats_sum = @user_data_stats_sum + {age}, "
+        f"@user_data_stats_sum_sq = @user_data_stats_sum_sq + {age} * {age}, "
+        f"@user_data_stats_min = LEAST(COALESCE(@user_data_stats_min, {age}), "
+        f"{age}), "
+        f"@user_data_stats_max = GREATEST(COALESCE(@user_data_stats_max, "
+        f"{age}), {age}), "
+        "@user_data_stats_buckets = CONCAT(@user_data_stats_buckets, "
+        f"FLOOR({age} / {BUCKET_WIDTH}), ',');"
+    )
+
+
+TRIGGERS = {
+    'user_data_stats_insert': (
+        "CREATE TRIGGER user_data_stats_insert AFTER INSERT ON user_data "
+        f"FOR EACH ROW BEGIN IF {DEFERRED} THEN {_defer_row('NEW.age')} "
+        f"ELSE {_add_row('NEW.age')} END IF; END"
+    ),
+    'user_data_stats_delete': (
+        "CREATE TRIGGER user_data_stats_delete AFTER DELETE ON user_data "
+        f"FOR EACH ROW BEGIN {_remove_row('OLD.age')} END"
+    ),
+    # ON DUPLICATE KEY no-ops in seed.insert_data fire this trigger too,
+    # hence the guard on an actual change of age.
+    'user_data_stats_update': (
+        "CREATE TRIGGER user_data_stats_update AFTER UPDATE ON user_data "
+        "FOR EACH ROW BEGIN IF NEW.age <> OLD.age THEN "
+        f"{_remove_row('OLD.age')} {_add_row('NEW.age')} "
+        "END IF; END"
+    ),
+}
+
+
+def create_stats(connection):
+    """Create the stats tables and triggers, then fill them if they are new.
+
+    Returns True when the stats were rebuilt as part of the setup.
+    """
+    cursor = connection.cursor()
+    try:
+        for ddl in TABLES.values():
+            cursor.execute(ddl)
+        cursor.execute(
+            "SELECT trigger_name, action_statement "
+            "FROM information_schema.triggers "
+            "WHERE trigger_schema = DATABASE() "
+            "AND event_object_table = 'user_data'"
+        )
+        existing = dict(cursor.fetchall())
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGERS[name])
+        # Insert triggers from before defer_stats existed are replaced;
+        # the stats they kept stay valid.
+        old_insert = existing.get('user_data_stats_insert')
+        if old_insert is not None and DEFERRED not in old_insert:
+            cursor.execute("DROP TRIGGER user_data_stats_insert")
+            cursor.execute(TRIGGERS['user_data_stats_insert'])
+        connection.commit()
+    except mysql.connector.Error as err:
+        print(f"Error creating stats tables: {err}")
+        cursor.close()
+        return False
+    cursor.close()
+    if missing:
+        rebuild_stats(connection)
+    return bool(missing)
+
+
+def rebuild_stats(connection):
+    """Recompute the summary and histogram from a full scan of user_data."""
+    cursor = connection.cursor()
+    try:
+        # Writers are blocked while the scan runs, so no insert can slip
+        # between the recount and the triggers taking over again.
+        cursor.execute(
+            "LOCK TABLES user_data READ, user_data_stats WRITE, "
+            "user_data_age_histogram WRITE"
+        )
+        cursor.execute("DELETE FROM user_data_stats")
+        cursor.execute(
+            "INSERT INTO user_data_stats "
+            "(id, row_count, age_sum, age_sum_sq, age_min, age_max) "
+            "SELECT 1, COUNT(*), COALESCE(SUM(age), 0), "
+            "COALESCE(SUM(age * age), 0), MIN(age), MAX(age) FROM user_data"
+        )
+        cursor.execute("DELETE FROM user_data_age_histogram")
+        cursor.execute(
+            "INSERT INTO user_data_age_histogram (bucket, row_count) "
+            f"SELECT FLOOR(age / {BUCKET_WIDTH}) AS bucket, COUNT(*) "
+            "FROM user_data GROUP BY bucket"
+        )
+        connection.commit()
+        print("user_data statistics rebuilt")
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"Error rebuilding stats: {err}")
+    finally:
+        cursor.execute("UNLOCK TABLES")
+        cursor.close()
+
+
+def defer_stats(cursor):
+    """Start collecting this session's inserts as one pending delta.
+
+    Call it before every batch, because session variables are not rolled
+    back with a failed batch.
+    """
+    cursor.execute(
+        f"SET {DEFERRED} = 1, @user_data_stats_rows = 0, "
+        "@user_data_stats_sum = 0, @user_data_stats_sum_sq = 0, "
+        "@user_data_stats_min = NULL, @user_data_stats_max = NULL, "
+        "@user_data_stats_buckets = ''"
+    )
+
+
+def apply_deferred(cursor):
+    """Add the pending delta to the stats tables; call it before commit."""
+    cursor.execute(
+        "INSERT INTO user_data_stats "
+        "(id, row_count, age_sum, age_sum_sq, age_min, age_max) "
+        "SELECT 1, @user_data_stats_rows, @user_data_stats_sum, "
+        "@user_data_stats_sum_sq, @user_data_stats_min, @user_data_stats_max "
+        "FROM DUAL WHERE @user_data_stats_rows > 0 "
+        "ON DUPLICATE KEY UPDATE "
+        "row_count = row_count + VALUES(row_count), "
+        "age_sum = age_sum + VALUES(age_sum), "
+        "age_sum_sq = age_sum_sq + VALUES(age_sum_sq), "
+        "age_min = LEAST(COALESCE(age_min, VALUES(age_min)), "
+        "VALUES(age_min)), "
+        "age_max = GREATEST(COALESCE(age_max, VALUES(age_max)), "
+        "VALUES(age_max))"
+    )
+    cursor.execute("SELECT @user_data_stats_buckets")
+    (buckets,) = cursor.fetchone()
+    if isinstance(buckets, (bytes, bytearray)):
+        buckets = buckets.decode()
+    counts = Counter(int(bucket) for bucket in (buckets or '').split(',')
+                     if bucket)
+    if counts:
+        cursor.executemany(
+            "INSERT INTO user_data_age_histogram (bucket, row_count) "
+            "VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE "
+            "row_count = row_count + VALUES(row_count)",
+            sorted(counts.items())
+        )
+
+
+def end_deferred(cursor):
+    """Let the triggers update the stats tables row by row again."""
+    cursor.execute(f"SET {DEFERRED} = NULL")
+
+
+def read_stats(connection):
+    """Return count, mean, variance, min, max and histogram as a dict."""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT row_count, age_sum, age_sum_sq, age_min, age_max "
+        "FROM user_data_stats WHERE id = 1"
+    )
+    row = cursor.fetchone() or (0, Decimal(0), Decimal(0), None, None)
+    cursor.execute(
+        "SELECT bucket, row_count FROM user_data_age_histogram "
+        "WHERE row_count > 0 ORDER BY bucket"
+    )
+    histogram = {
+        (bucket * BUCKET_WIDTH, (bucket + 1) * BUCKET_WIDTH): count
+        for bucket, count in cursor.fetchall()
+    }
+    cursor.close()
+
+    count, total, total_sq, age_min, age_max = row
+    mean = total / count if count else 0
+    variance = total_sq / count - mean * mean if count else 0
+    return {
+        'count': count,
+        'sum': total,
+        'mean': mean,
+        'variance': variance,
+        'min': age_min,
+        'max': age_max,
+        'histogram': histogram,
+    }
+
+
+if __name__ == "__main__":
+    seed = __import__('seed')
+    connection = seed.connect_to_prodev()
+    try:
+        if sys.argv[1:] == ['rebuild']:
+            if not create_stats(connection):
+                rebuild_stats(connection)
+        else:
+            for name, value in read_stats(connection).items():
+                print(f"{name}: {value}")
+    finally:
+        connection.close()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the adaptive module.
+"""
+
+import unittest
+from adaptive import BatchSizer, batch_bytes
+
+
+class TestBatchSizer(unittest.TestCase):
+    """
+    Test cases for BatchSizer.
+    """
+
+    def test_bounds(self):
+        """
+        Test that invalid bounds raise and the initial size is clamped.
+        """
+        for minimum, maximum in ((0, 10), (10, 5)):
+            with self.subTest(minimum=minimum, maximum=maximum):
+                with self.assertRaises(ValueError):
+                    BatchSizer(minimum=minimum, maximum=maximum)
+        self.assertEqual(BatchSizer(initial=10).size, 100)
+        self.assertEqual(BatchSizer(initial=10 ** 9).size, 100000)
+
+    def test_grows_by_max_step(self):
+        """
+        Test that fast fetches grow the size by at most max_step.
+        """
+        sizer = BatchSizer(initial=1000)
+        self.assertEqual(sizer.observe(1000, 0.001, 1000), 2000)
+        self.assertEqual(sizer.observe(2000, 0.002, 2000), 4000)
+
+    def test_shrinks_by_max_step(self):
+        """
+        Test that slow fetches shrink the size by at most max_step.
+        """
+        sizer = BatchSizer(initial=1000)
+        self.assertEqual(sizer.observe(1000, 1.0, 1000), 500)
+        self.assertEqual(sizer.observe(500, 0.5, 500), 250)
+
+    def test_converges_on_target(self):
+        """
+        Test that a steady fetch rate settles on target_seconds per batch.
+        """
+        sizer = BatchSizer(initial=100, target_seconds=0.1)
+        for _ in range(20):
+            size = sizer.size
+            sizer.observe(size, size * 1e-4, size * 100)
+        self.assertEqual(sizer.size, 1000)
+
+    def test_memory_limit(self):
+        """
+        Test that wide rows cap the size at memory_limit bytes.
+        """
+        sizer = BatchSizer(initial=1000, memory_limit=1 << 20)
+        for _ in range(5):
+            sizer.observe(sizer.size, 1e-6, sizer.size * 4096)
+        self.assertEqual(sizer.size, (1 << 20) // 4096)
+
+    def test_short_batch_does_not_grow(self):
+        """
+        Test that a short final batch never grows the size.
+        """
+        sizer = BatchSizer(initial=1000)
+        self.assertEqual(sizer.observe(10, 1e-6, 100), 1000)
+        self.assertEqual(sizer.observe(10, 1.0, 100), 500)
+
+    def test_empty_batch(self):
+        """
+        Test that an empty batch leaves the size and estimates alone.
+        """
+        sizer = BatchSizer(initial=1000)
+        self.assertEqual(sizer.observe(0, 0.5, 0), 1000)
+        self.assertIsNone(sizer.seconds_per_row)
+
+    def test_clamped(self):
+        """
+        Test that the size stays between minimum and maximum.
+        """
+        slow = BatchSizer(initial=100, minimum=100, maximum=150)
+        self.assertEqual(slow.observe(100, 10.0, 100), 100)
+        fast = BatchSizer(initial=100, minimum=100, maximum=150)
+        self.assertEqual(fast.observe(100, 1e-9, 100), 150)
+
+
+class TestBatchBytes(unittest.TestCase):
+    """
+    Test cases for batch_bytes.
+    """
+
+    def test_empty(self):
+        """
+        Test that an empty batch takes no bytes.
+        """
+        self.assertEqual(batch_bytes([]), 0)
+
+    def test_scales_with_rows(self):
+        """
+        Test that the estimate grows linearly with uniform rows.
+        """
+        row = {'user_id': 'x' * 36, 'age': 42}
+        self.assertEqual(batch_bytes([row] * 1000),
+                         10 * batch_bytes([row] * 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the aggregates module.
+"""
+
+import random
+import unittest
+from aggregates import KLLSketch, RunningStats, Summary
+
+
+def rank_error(values, item, q):
+    """
+    Distance between the rank of item in sorted values and q.
+    """
+    below = sum(value < item for value in values)
+    at_or_below = sum(value <= item for value in values)
+    count = len(values)
+    if below / count <= q <= at_or_below / count:
+        return 0.0
+    return min(abs(below / count - q), abs(at_or_below / count - q))
+
+
+class TestKLLSketch(unittest.TestCase):
+    """
+    Test cases for the KLLSketch quantile sketch.
+    """
+
+    QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+    def setUp(self):
+        """
+        Build 20000 distinct values in a fixed shuffled order.
+        """
+        self.values = [float(value) for value in range(20000)]
+        random.Random(1).shuffle(self.values)
+
+    def sketch(self, values, seed=0, k=200):
+        """
+        Return a sketch fed with values.
+        """
+        sketch = KLLSketch(k, random.Random(seed))
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def assertRankError(self, sketch, values, bound):
+        """
+        Assert every tested quantile is within bound of its true rank.
+        """
+        for q in self.QUANTILES:
+            with self.subTest(q=q):
+                item = sketch.quantile(q)
+                self.assertLessEqual(rank_error(values, item, q), bound)
+
+    def test_empty_sketch(self):
+        """
+        Test that an empty sketch has no quantiles.
+        """
+        self.assertIsNone(KLLSketch().quantile(0.5))
+
+    def test_small_input_is_exact(self):
+        """
+        Test that a sketch that never compressed returns exact ranks.
+        """
+        sketch = self.sketch([5.0, 1.0, 3.0, 2.0, 4.0])
+        self.assertEqual(sketch.quantile(0), 1.0)
+        self.assertEqual(sketch.quantile(0.5), 3.0)
+        self.assertEqual(sketch.quantile(1), 5.0)
+
+    def test_quantile_error(self):
+        """
+        Test that quantiles stay within a few times 1.7 / k of their rank.
+        """
+        sketch = self.sketch(self.values)
+        self.assertRankError(sketch, self.values, 3 * 1.7 / sketch.k)
+
+    def test_memory_is_bounded(self):
+        """
+        Test that the sketch keeps far fewer items than it was fed.
+        """
+        sketch = self.sketch(self.values)
+        self.assertLess(sketch.size, 4 * sketch.k)
+
+    def test_weight_is_preserved(self):
+        """
+        Test that compaction keeps the total weight equal to the count.
+        """
+        sketch = self.sketch(self.values)
+        weight = sum(len(items) << height
+                     for height, items in enumerate(sketch.levels))
+        self.assertEqual(weight, len(self.values))
+
+    def test_merge(self):
+        """
+        Test that merged partition sketches answer for the whole input.
+        """
+        parts = [self.values[i::4] for i in range(4)]
+        merged = self.sketch(parts[0], seed=0)
+        for seed, part in enumerate(parts[1:], 1):
+            self.assertIs(merged.merge(self.sketch(part, seed=seed)), merged)
+        weight = sum(len(items) << height
+                     for height, items in enumerate(merged.levels))
+        self.assertEqual(weight, len(self.values))
+        self.assertLess(merged.size, merged.max_size)
+        self.assertRankError(merged, self.values, 3 * 1.7 / merged.k)
+
+    def test_merge_uneven_heights(self):
+        """
+        Test merging a deep sketch into a shallow one grows its levels.
+        """
+        shallow = self.sketch(self.values[:10], seed=0)
+        deep = self.sketch(self.values[10:], seed=1)
+        shallow.merge(deep)
+        self.assertEqual(len(shallow.levels), len(deep.levels))
+        self.assertRankError(shallow, self.values, 3 * 1.7 / shallow.k)
+
+
+class TestSummary(unittest.TestCase):
+    """
+    Test cases for RunningStats and Summary merging.
+    """
+
+    def test_merge_matches_single_pass(self):
+        """
+        Test that merging partition summaries equals one summary of all.
+        """
+        rng = random.Random(2)
+        values = [rng.uniform(18, 90) for _ in range(3000)]
+        whole = Summary().update(values).result()
+        merged = Summary().update(values[:1000])
+        merged.merge(Summary().update(values[1000:]))
+        merged = merged.result()
+        self.assertEqual(merged['count'], whole['count'])
+        self.assertAlmostEqual(merged['mean'], whole['mean'])
+        self.assertAlmostEqual(merged['variance'], whole['variance'])
+        self.assertEqual(merged['min'], whole['min'])
+        self.assertEqual(merged['max'], whole['max'])
+        self.assertEqual(merged['histogram'], whole['histogram'])
+
+    def test_merge_empty_stats(self):
+        """
+        Test that merging an empty RunningStats changes nothing.
+        """
+        stats = RunningStats()
+        for value in (1.0, 2.0, 3.0):
+            stats.add(value)
+        stats.merge(RunningStats())
+        self.assertEqual(stats.count, 3)
+        self.assertAlmostEqual(stats.mean, 2.0)
+
+    def test_merge_different_widths(self):
+        """
+        Test that histograms of different bucket widths cannot merge.
+        """
+        with self.assertRaises(ValueError):
+            Summary(bucket_width=10).merge(Summary(bucket_width=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
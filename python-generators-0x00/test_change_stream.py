@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Unit tests for stream_changes and its watermark, against SQLite through
+sqlite_compat.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from itertools import islice
+from unittest.mock import patch
+import sqlite_compat
+change_stream = __import__('7-change_stream')
+
+EARLY = '2026-01-01 00:00:00.000'
+LATER = '2026-02-01 00:00:00.000'
+FUTURE = '2026-09-01 00:00:00.000'
+
+
+class TestStreamChanges(unittest.TestCase):
+    """
+    Test that a watermark picks up where the last run stopped.
+    """
+
+    ROWS = 10
+
+    def setUp(self):
+        """
+        Create users all changed at EARLY and serve them as prodev.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.database = os.path.join(self.directory, 'users.db')
+        self.path = os.path.join(self.directory, 'changes.json')
+        self.ids = sqlite_compat.create_users(self.database, self.ROWS)
+        self.touch(self.ids, EARLY)
+        serving = sqlite_compat.serving_prodev(self.database)
+        serving.__enter__()
+        self.addCleanup(serving.__exit__, None, None, None)
+
+        # SQLite has no NOW(6) - INTERVAL; answer it with self.until.
+        self.until = '2026-06-01 00:00:00.000'
+        execute = sqlite_compat.Cursor.execute
+
+        def now(cursor, operation, params=()):
+            if operation.startswith("SELECT NOW(6)"):
+                operation, params = "SELECT %s", (self.until,)
+            execute(cursor, operation, params)
+        patcher = patch.object(sqlite_compat.Cursor, 'execute', now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def touch(self, ids, updated_at):
+        """
+        Set updated_at of the given users.
+        """
+        connection = sqlite_compat.connect(self.database)
+        cursor = connection.cursor()
+        cursor.executemany(
+            "UPDATE user_data SET updated_at = %s WHERE user_id = %s",
+            [(updated_at, user_id) for user_id in ids])
+        connection.commit()
+        connection.close()
+
+    def changes(self, limit=None):
+        """
+        Return the user_ids of one run over a watermark reloaded from disk.
+        """
+        rows = change_stream.stream_changes(
+            change_stream.watermark(self.path, interval=1), batch_size=3)
+        ids = [row['user_id'] for row in islice(rows, limit)]
+        rows.close()
+        return ids
+
+    def test_default(self):
+        """
+        Test that inserted rows get updated_at from the column default.
+        """
+        path = os.path.join(self.directory, 'fresh.db')
+        sqlite_compat.create_users(path, 1)
+        connection = sqlite_compat.connect(path)
+        cursor = connection.cursor()
+        cursor.execute("SELECT updated_at FROM user_data")
+        (updated_at,) = cursor.fetchone()
+        connection.close()
+        self.assertRegex(updated_at, r'^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d+$')
+
+    def test_round_trip(self):
+        """
+        Test that each run yields only what changed since the last one.
+        """
+        self.assertEqual(self.changes(), self.ids)
+        self.assertEqual(change_stream.watermark(self.path).last_key,
+                         [EARLY, self.ids[-1]])
+        self.assertEqual(self.changes(), [])
+
+        self.touch([self.ids[7], self.ids[2]], LATER)
+        self.touch([self.ids[5]], FUTURE)
+        self.assertEqual(self.changes(), [self.ids[2], self.ids[7]])
+        self.assertEqual(self.changes(), [])
+
+        self.until = '2026-12-01 00:00:00.000'
+        self.assertEqual(self.changes(), [self.ids[5]])
+
+    def test_resume(self):
+        """
+        Test that a stopped run resumes at the first unfinished row.
+        """
+        self.assertEqual(self.changes(4), self.ids[:4])
+        self.assertEqual(self.changes(), self.ids[3:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the checkpoint module and for resuming the streaming
+generators from a checkpoint, against SQLite through sqlite_compat.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from itertools import islice
+import sqlite_compat
+from checkpoint import Checkpoint
+stream_users = __import__('0-stream_users').stream_users
+stream_users_in_batches = __import__(
+    '1-batch_processing').stream_users_in_batches
+
+
+class CheckpointTestCase(unittest.TestCase):
+    """
+    Base class with a temporary directory for checkpoint files.
+    """
+
+    def setUp(self):
+        """
+        Create the directory and the checkpoint path inside it.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'scan.json')
+
+
+class TestCheckpoint(CheckpointTestCase):
+    """
+    Test cases for Checkpoint.
+    """
+
+    def test_no_checkpoint(self):
+        """
+        Test that a missing file means starting from the top.
+        """
+        checkpoint = Checkpoint(self.path)
+        self.assertIsNone(checkpoint.last_key)
+        checkpoint.save()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_saves_every_interval(self):
+        """
+        Test that advance writes the file once interval rows went by.
+        """
+        checkpoint = Checkpoint(self.path, interval=3)
+        checkpoint.advance('a')
+        checkpoint.advance('b')
+        self.assertFalse(os.path.exists(self.path))
+        checkpoint.advance('c')
+        with open(self.path) as file:
+            self.assertEqual(json.load(file),
+                             {'key': 'user_id', 'last_key': 'c'})
+        self.assertEqual(checkpoint.pending, 0)
+        self.assertEqual(os.listdir(self.directory), ['scan.json'])
+
+    def test_reload(self):
+        """
+        Test that a new Checkpoint on the same path picks up the key.
+        """
+        checkpoint = Checkpoint(self.path)
+        checkpoint.advance('k', rows=5)
+        checkpoint.save()
+        self.assertEqual(Checkpoint(self.path).last_key, 'k')
+
+    def test_other_key(self):
+        """
+        Test that a checkpoint of another key column is rejected.
+        """
+        checkpoint = Checkpoint(self.path)
+        checkpoint.advance('k')
+        checkpoint.save()
+        with self.assertRaises(ValueError):
+            Checkpoint(self.path, key='email')
+
+    def test_reset(self):
+        """
+        Test that reset forgets the key and removes the file.
+        """
+        checkpoint = Checkpoint(self.path)
+        checkpoint.advance('k')
+        checkpoint.save()
+        checkpoint.reset()
+        checkpoint.reset()
+        self.assertIsNone(checkpoint.last_key)
+        self.assertFalse(os.path.exists(self.path))
+
+
+class TestResume(CheckpointTestCase):
+    """
+    Test that interrupted scans resume after the last delivered row.
+    """
+
+    ROWS = 23
+
+    def setUp(self):
+        """
+        Point seed.connect_to_prodev at a SQLite user_data table.
+        """
+        super().setUp()
+        path = os.path.join(self.directory, 'users.db')
+        self.ids = sqlite_compat.create_users(path, self.ROWS)
+        serving = sqlite_compat.serving_prodev(path)
+        serving.__enter__()
+        self.addCleanup(serving.__exit__, None, None, None)
+
+    def test_stream_users(self):
+        """
+        Test that a stopped stream_users resumes at the first row the
+        consumer did not finish.
+        """
+        users = stream_users(chunk_size=4,
+                             checkpoint=Checkpoint(self.path, interval=2))
+        first = [user['user_id'] for user in islice(users, 7)]
+        users.close()
+        self.assertEqual(first, self.ids[:7])
+        self.assertEqual(Checkpoint(self.path).last_key, self.ids[5])
+
+        users = stream_users(chunk_size=4, checkpoint=Checkpoint(self.path))
+        self.assertEqual([user['user_id'] for user in users], self.ids[6:])
+        self.assertEqual(Checkpoint(self.path).last_key, self.ids[-1])
+
+    def test_stream_users_row_format(self):
+        """
+        Test resuming with tuple rows, where the key is found by position.
+        """
+        users = stream_users(checkpoint=Checkpoint(self.path),
+                             row_format='tuple')
+        list(islice(users, 3))
+        users.close()
+        users = stream_users(checkpoint=Checkpoint(self.path),
+                             row_format='tuple')
+        self.assertEqual(next(users)[0], self.ids[2])
+
+    def test_stream_users_in_batches(self):
+        """
+        Test that batches are recorded once the next one is asked for.
+        """
+        batches = stream_users_in_batches(
+            5, checkpoint=Checkpoint(self.path, interval=1))
+        self.assertEqual(len(next(batches)), 5)
+        self.assertEqual(len(next(batches)), 5)
+        batches.close()
+        self.assertEqual(Checkpoint(self.path).last_key, self.ids[4])
+
+        batches = stream_users_in_batches(5, checkpoint=Checkpoint(self.path))
+        rest = [user['user_id'] for batch in batches for user in batch]
+        self.assertEqual(rest, self.ids[5:])
+
+    def test_key_mismatch(self):
+        """
+        Test that a key other than the checkpoint's is rejected.
+        """
+        batches = stream_users_in_batches(5, key='email',
+                                          checkpoint=Checkpoint(self.path))
+        with self.assertRaises(ValueError):
+            next(batches)
+
+
+if __name__ == '__main__':
+    unittest.main()
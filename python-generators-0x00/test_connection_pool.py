@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the connection_pool module.
+"""
+
+import gc
+import os
+import threading
+import unittest
+from unittest.mock import patch
+import mysql.connector
+from mysql.connector.errors import PoolError
+from connection_pool import ConnectionPool
+seed = __import__('seed')
+stream_users = __import__('0-stream_users').stream_users
+
+
+class FakeConnection:
+    """
+    Stand-in for a mysql.connector connection that records its calls.
+    """
+
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+        self.unread_result = False
+        self.fail_rollback = False
+
+    def rollback(self):
+        """
+        Count the rollback, or fail like a dropped connection.
+        """
+        if self.fail_rollback:
+            raise OSError("connection lost")
+        self.rollbacks += 1
+
+    def is_connected(self):
+        """
+        Return whether the fake server still has the connection.
+        """
+        return self.alive
+
+    def close(self):
+        """
+        Mark the connection closed.
+        """
+        self.closed = True
+
+
+class PoolTestCase(unittest.TestCase):
+    """
+    Base class with a pool over FakeConnections.
+    """
+
+    def setUp(self):
+        """
+        Keep every connection the pool opens in self.opened.
+        """
+        self.opened = []
+
+    def connect(self):
+        """
+        Open a new FakeConnection.
+        """
+        connection = FakeConnection(len(self.opened))
+        self.opened.append(connection)
+        return connection
+
+    def pool(self, **options):
+        """
+        Return a ConnectionPool over self.connect.
+        """
+        return ConnectionPool(self.connect, **options)
+
+
+class TestRelease(PoolTestCase):
+    """
+    Test returning connections to the pool.
+    """
+
+    def test_reuse(self):
+        """
+        Test that a closed wrapper's connection is rolled back and reused.
+        """
+        pool = self.pool(size=2)
+        first = pool.checkout()
+        self.assertEqual(first.number, 0)
+        first.close()
+        first.close()
+        self.assertEqual(self.opened[0].rollbacks, 1)
+        with pool.connection() as second:
+            self.assertEqual(second.number, 0)
+        metrics = pool.metrics()
+        self.assertEqual((metrics['created'], metrics['reused']), (1, 1))
+        self.assertEqual((metrics['in_use'], metrics['idle']), (0, 1))
+
+    def test_use_after_close(self):
+        """
+        Test that a returned wrapper can no longer be used.
+        """
+        connection = self.pool().checkout()
+        connection.close()
+        with self.assertRaises(PoolError):
+            connection.rollback()
+
+    def test_discard(self):
+        """
+        Test that unread results or a failed rollback close the connection.
+        """
+        pool = self.pool()
+        for attribute in ('unread_result', 'fail_rollback'):
+            with self.subTest(attribute=attribute):
+                with pool.connection():
+                    setattr(self.opened[-1], attribute, True)
+                self.assertTrue(self.opened[-1].closed)
+                self.assertEqual(pool.metrics()['idle'], 0)
+        self.assertEqual(pool.metrics()['discarded'], 2)
+
+    def test_released_on_error(self):
+        """
+        Test that the with block returns its connection on an exception.
+        """
+        pool = self.pool()
+        with self.assertRaises(KeyError):
+            with pool.connection():
+                raise KeyError('boom')
+        self.assertEqual(pool.metrics()['in_use'], 0)
+
+    def test_connect_failure(self):
+        """
+        Test that a failing connect() does not use up a slot.
+        """
+        pool = ConnectionPool(lambda: 1 / 0, size=1)
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                pool.checkout(timeout=0)
+        self.assertEqual(pool.metrics()['in_use'], 0)
+
+
+class TestLeaks(PoolTestCase):
+    """
+    Test that abandoned wrappers give their slot back.
+    """
+
+    def test_dropped_wrapper(self):
+        """
+        Test that a wrapper collected without close() is released.
+        """
+        pool = self.pool(size=1)
+        pool.checkout()
+        gc.collect()
+        self.assertEqual(pool.metrics()['in_use'], 0)
+        self.assertEqual(pool.checkout(timeout=0).number, 0)
+
+    def test_abandoned_generator(self):
+        """
+        Test that a generator stopped early returns its connection.
+        """
+        pool = self.pool(size=1)
+
+        def rows():
+            with pool.connection():
+                yield from range(10)
+        iterator = rows()
+        next(iterator)
+        self.assertEqual(pool.metrics()['in_use'], 1)
+        del iterator
+        gc.collect()
+        self.assertEqual(pool.metrics()['in_use'], 0)
+
+
+class TestWaiting(PoolTestCase):
+    """
+    Test checkouts from a full pool.
+    """
+
+    def test_timeout(self):
+        """
+        Test that checkout raises PoolError once timeout runs out.
+        """
+        pool = self.pool(size=1)
+        held = pool.checkout()
+        with self.assertRaises(PoolError):
+            pool.checkout(timeout=0.05)
+        held.close()
+        self.assertEqual(pool.metrics()['in_use'], 0)
+
+    def test_wait_for_release(self):
+        """
+        Test that a waiting checkout gets the connection when it returns.
+        """
+        pool = self.pool(size=1)
+        held = pool.checkout()
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(pool.checkout(timeout=5).number))
+        waiter.start()
+        threading.Timer(0.05, held.close).start()
+        waiter.join()
+        self.assertEqual(got, [0])
+        self.assertEqual(pool.metrics()['waits'], 1)
+
+
+class TestHealthChecks(PoolTestCase):
+    """
+    Test that dead idle connections are replaced.
+    """
+
+    def test_checkout_replaces_dead(self):
+        """
+        Test that a stale idle connection is pinged and replaced.
+        """
+        pool = self.pool(health_check_after=0)
+        pool.checkout().close()
+        self.opened[0].alive = False
+        with pool.connection() as connection:
+            self.assertEqual(connection.number, 1)
+        self.assertTrue(self.opened[0].closed)
+        self.assertEqual(pool.metrics()['health_check_failures'], 1)
+
+    def test_health_check(self):
+        """
+        Test that health_check drops only the dead idle connections.
+        """
+        pool = self.pool()
+        held = [pool.checkout() for _ in range(3)]
+        for connection in held:
+            connection.close()
+        self.opened[1].alive = False
+        self.assertEqual(pool.health_check(), 1)
+        self.assertEqual(pool.metrics()['idle'], 2)
+
+    def test_health_check_keeps_size(self):
+        """
+        Test that checkouts during a health check do not go over size.
+        """
+        pool = self.pool(size=2)
+        held = [pool.checkout() for _ in range(2)]
+        for connection in held:
+            connection.close()
+        pinging, resume = threading.Event(), threading.Event()
+
+        def slow_ping():
+            pinging.set()
+            resume.wait()
+            return True
+        for connection in self.opened:
+            connection.is_connected = slow_ping
+        checker = threading.Thread(target=pool.health_check, daemon=True)
+        checker.start()
+        self.addCleanup(resume.set)
+        pinging.wait()
+        got = []
+        waiter = threading.Thread(
+            target=lambda: got.append(pool.checkout(timeout=5)), daemon=True)
+        waiter.start()
+        waiter.join(0.05)
+        self.assertEqual(len(self.opened), 2)
+        resume.set()
+        checker.join()
+        waiter.join()
+        got[0].close()
+        metrics = pool.metrics()
+        self.assertEqual(len(self.opened), 2)
+        self.assertEqual((metrics['in_use'], metrics['idle']), (0, 2))
+
+
+class TestFork(PoolTestCase):
+    """
+    Test the pool in a process forked after it was used.
+    """
+
+    def test_child_opens_its_own(self):
+        """
+        Test that a child never reuses or closes the parent's connections.
+        """
+        pool = self.pool(size=2)
+        pool.checkout().close()
+        in_parent = pool.checkout()
+        with patch('connection_pool.os.getpid', return_value=os.getpid() + 1):
+            with pool.connection() as connection:
+                self.assertEqual(connection.number, 1)
+            self.assertEqual(pool.metrics()['idle'], 1)
+            in_parent.close()
+            self.assertEqual(pool.metrics()['in_use'], 0)
+            self.assertEqual(pool.metrics()['idle'], 1)
+        for connection in self.opened[:1]:
+            self.assertFalse(connection.closed)
+            self.assertEqual(connection.rollbacks, 1)
+            self.assertIn(connection, pool._inherited)
+
+    def test_real_fork(self):
+        """
+        Test a checkout in a forked child against the parent's pool.
+        """
+        pool = self.pool()
+        pool.checkout().close()
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                with pool.connection() as connection:
+                    os.write(write, bytes([connection.number]))
+            finally:
+                os._exit(0)
+        os.close(write)
+        os.waitpid(pid, 0)
+        with os.fdopen(read, 'rb') as child:
+            self.assertEqual(child.read(), bytes([1]))
+        self.assertEqual(len(self.opened), 1)
+
+
+
+class TestConnectToProdev(unittest.TestCase):
+    """
+    Test that connection failures reach the generators' callers.
+    """
+
+    def test_unreachable_server(self):
+        """
+        Test that the driver error is raised, not returned as None.
+        """
+        def refuse():
+            raise mysql.connector.Error("Can't connect to MySQL server")
+        pool = ConnectionPool(refuse)
+        with patch.object(seed, 'prodev_pool', pool):
+            with self.assertRaises(mysql.connector.Error):
+                seed.connect_to_prodev()
+            with self.assertRaises(mysql.connector.Error):
+                next(stream_users())
+        self.assertEqual(pool.metrics()['in_use'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
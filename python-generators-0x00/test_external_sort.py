@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the external_sort module.
+"""
+
+import random
+import unittest
+from operator import itemgetter
+from unittest.mock import patch
+import external_sort
+from external_sort import external_group_by
+
+
+def records(count, keys=10, seed=0):
+    """
+    Return (key, sequence number) pairs with many repeated keys.
+    """
+    rng = random.Random(seed)
+    return [(rng.randrange(keys), number) for number in range(count)]
+
+
+class TestExternalSort(unittest.TestCase):
+    """
+    Test cases for the external_sort function.
+    """
+
+    def sort(self, items, **options):
+        """
+        Return external_sort's output, counting spills and merge passes.
+        """
+        with patch('external_sort._spill',
+                   wraps=external_sort._spill) as spill, \
+                patch('external_sort._merge_runs',
+                      wraps=external_sort._merge_runs) as merge:
+            result = list(external_sort.external_sort(items, **options))
+        self.spills = spill.call_count
+        self.merges = merge.call_count
+        return result
+
+    def test_in_memory(self):
+        """
+        Test that input under the memory limit never touches the disk.
+        """
+        items = records(200)
+        self.assertEqual(self.sort(items, key=itemgetter(0)),
+                         sorted(items, key=itemgetter(0)))
+        self.assertEqual(self.spills, 0)
+
+    def test_empty(self):
+        """
+        Test that an empty input yields nothing.
+        """
+        self.assertEqual(self.sort([]), [])
+
+    def test_single_pass_merge(self):
+        """
+        Test spilled runs merge in one pass when they fit max_fan_in.
+        """
+        items = records(500)
+        result = self.sort(items, memory_limit=4096, max_fan_in=64)
+        self.assertEqual(result, sorted(items))
+        self.assertGreater(self.spills, 1)
+        self.assertEqual(self.merges, 0)
+
+    def test_multi_pass_merge(self):
+        """
+        Test that more runs than max_fan_in are merged in several passes.
+        """
+        items = records(500)
+        result = self.sort(items, key=itemgetter(0), memory_limit=1000,
+                           max_fan_in=2)
+        self.assertEqual(result, sorted(items, key=itemgetter(0)))
+        self.assertGreater(self.spills, 4)
+        # Pairwise merging of n runs takes at least n - 2 merges before
+        # the final heapq.merge of the last two.
+        self.assertGreaterEqual(self.merges, self.spills - 2)
+
+    def test_stable(self):
+        """
+        Test that equal keys keep their input order, like sorted().
+        """
+        items = records(500, keys=3)
+        for reverse in (False, True):
+            for options in ({}, {'memory_limit': 1000, 'max_fan_in': 2}):
+                with self.subTest(reverse=reverse, **options):
+                    result = self.sort(items, key=itemgetter(0),
+                                       reverse=reverse, **options)
+                    self.assertEqual(result, sorted(items, key=itemgetter(0),
+                                                    reverse=reverse))
+
+    def test_early_close(self):
+        """
+        Test that closing the generator early closes its spilled runs.
+        """
+        runs = []
+
+        def spill(items, tmpdir, chunk_rows):
+            run = spill.original(items, tmpdir, chunk_rows)
+            runs.append(run)
+            return run
+        spill.original = external_sort._spill
+        with patch('external_sort._spill', spill):
+            sorted_items = external_sort.external_sort(records(500),
+                                                       memory_limit=1000)
+            next(sorted_items)
+            sorted_items.close()
+        self.assertTrue(runs)
+        self.assertTrue(all(run.closed for run in runs))
+
+    def test_chunks_fit_memory_limit(self):
+        """
+        Test that max_fan_in chunks, one per run, fit in memory_limit.
+        """
+        items = records(2000)
+        row_bytes = external_sort.approximate_size(items[0])
+        chunks = []
+        dump = external_sort.pickle.dump
+
+        def record(chunk, *args):
+            chunks.append(len(chunk))
+            dump(chunk, *args)
+        with patch('external_sort.pickle.dump', record):
+            result = self.sort(items, memory_limit=20000, max_fan_in=8)
+        self.assertEqual(result, sorted(items))
+        self.assertGreater(self.spills, 8)
+        self.assertGreater(self.merges, 0)
+        self.assertLessEqual(max(chunks) * row_bytes * 8, 20000)
+
+    def test_chunk_rows(self):
+        """
+        Test the chunk size bounds.
+        """
+        self.assertEqual(external_sort._chunk_rows(1000, 64, 200), 1)
+        self.assertEqual(external_sort._chunk_rows(64000, 64, 100), 10)
+        self.assertEqual(external_sort._chunk_rows(1 << 40, 2, 10),
+                         external_sort.CHUNK_ROWS)
+
+
+class TestExternalGroupBy(unittest.TestCase):
+    """
+    Test cases for the external_group_by function.
+    """
+
+    def test_group_counts(self):
+        """
+        Test that groups come out in key order with every row counted.
+        """
+        items = records(500)
+        counts = {}
+        for key, _ in items:
+            counts[key] = counts.get(key, 0) + 1
+        groups = external_group_by(items, itemgetter(0),
+                                   aggregate=lambda rows: sum(1 for _ in rows),
+                                   memory_limit=1000, max_fan_in=2)
+        self.assertEqual(list(groups), sorted(counts.items()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the instrument module, against SQLite through
+sqlite_compat.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import sqlite_compat
+from instrument import StreamMetrics
+lazy_paginate = __import__('2-lazy_paginate')
+
+
+class TestLazyPaginationMetrics(unittest.TestCase):
+    """
+    Test the metrics lazy_pagination fills in.
+    """
+
+    ROWS = 23
+
+    def setUp(self):
+        """
+        Point seed.connect_to_prodev at a SQLite user_data table.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'users.db')
+        sqlite_compat.create_users(path, self.ROWS)
+        serving = sqlite_compat.serving_prodev(path)
+        serving.__enter__()
+        self.addCleanup(serving.__exit__, None, None, None)
+
+    def test_prefetch(self):
+        """
+        Test rows, batches and queue depth with a PageFetcher.
+        """
+        metrics = StreamMetrics()
+        pages = []
+        for page in lazy_paginate.lazy_pagination(5, 'user_id', prefetch=2,
+                                                  metrics=metrics):
+            if not pages:
+                # Let the fetcher fill its queue of two pages.
+                time.sleep(0.2)
+            pages.append(page)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(metrics.rows, self.ROWS)
+        # The walk ends on a sixth, empty fetch.
+        self.assertEqual(metrics.batches, 6)
+        self.assertEqual(metrics.max_queue_depth, 2)
+        self.assertGreater(metrics.bytes_fetched, 0)
+
+    def test_cache(self):
+        """
+        Test that pages served from a PageCache are counted too.
+        """
+        cache = lazy_paginate.PageCache(5, 'user_id')
+        for _ in range(2):
+            metrics = StreamMetrics()
+            pages = list(lazy_paginate.lazy_pagination(
+                5, 'user_id', cache=cache, metrics=metrics))
+            self.assertEqual(sum(len(page) for page in pages), self.ROWS)
+            self.assertEqual(metrics.rows, self.ROWS)
+            self.assertEqual(metrics.batches, 5)
+        self.assertEqual(cache.misses, 5)
+        self.assertEqual(cache.hits, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Unit tests for PageCache and lazy_pagination in 2-lazy_paginate,
+run against a SQLite user_data table through sqlite_compat.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import sqlite_compat
+from query import Query
+lazy_paginate = __import__('2-lazy_paginate')
+PageCache = lazy_paginate.PageCache
+
+
+class PageCacheTestCase(unittest.TestCase):
+    """
+    Base class that points seed.connect_to_prodev at a SQLite table of
+    self.ROWS users and counts the connections opened.
+    """
+
+    ROWS = 23
+
+    def setUp(self):
+        """
+        Create the table and patch the connection factory.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'users.db')
+        self.ids = sqlite_compat.create_users(path, self.ROWS)
+        serving = sqlite_compat.serving_prodev(path)
+        self.opened = serving.__enter__()
+        self.addCleanup(serving.__exit__, None, None, None)
+
+    @property
+    def queries(self):
+        """
+        Number of connections opened, one per page query.
+        """
+        return len(self.opened)
+
+    def page_ids(self, page):
+        """
+        Return the user_ids of a page of dict rows.
+        """
+        return [row['user_id'] for row in page]
+
+
+class TestPageCacheBoundaries(PageCacheTestCase):
+    """
+    Test keyset page boundaries and random access.
+    """
+
+    def test_sequential_pages(self):
+        """
+        Test that every page matches the same slice of the sorted table.
+        """
+        cache = PageCache(5, key='user_id')
+        for number in range(5):
+            with self.subTest(page=number):
+                self.assertEqual(self.page_ids(cache.page(number)),
+                                 self.ids[number * 5:number * 5 + 5])
+        self.assertEqual(cache.boundaries[3], self.ids[14])
+
+    def test_random_access_skips_from_nearest_boundary(self):
+        """
+        Test that an unseen page is reached from the closest known key.
+        """
+        cache = PageCache(5, key='user_id')
+        self.assertEqual(self.page_ids(cache.page(3)), self.ids[15:20])
+        self.assertEqual(cache.boundaries, {0: None, 4: self.ids[19]})
+        self.assertEqual(self.page_ids(cache[4]), self.ids[20:])
+        self.assertEqual(self.page_ids(cache[1]), self.ids[5:10])
+        self.assertEqual(self.page_ids(cache[2]), self.ids[10:15])
+        self.assertEqual(cache._known, [0, 2, 3, 4])
+
+    def test_offset_pages(self):
+        """
+        Test that pages without a key are plain OFFSET pages.
+        """
+        cache = PageCache(5)
+        self.assertEqual(len(cache.page(4)), 3)
+        self.assertEqual(len(cache.page(0)), 5)
+        self.assertEqual(cache.boundaries, {0: None})
+
+    def test_negative_page(self):
+        """
+        Test that page numbers below 0 raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            PageCache(5).page(-1)
+
+    def test_hits_and_eviction(self):
+        """
+        Test cache hits and that the oldest page is evicted first.
+        """
+        cache = PageCache(5, key='user_id')
+        cache.page(0)
+        cache.page(0)
+        self.assertEqual((cache.hits, cache.misses, self.queries), (1, 1, 1))
+        cache.memory_limit = cache.used * 5 // 2
+        cache.page(1)
+        cache.page(2)
+        self.assertEqual(list(cache.pages), [1, 2])
+        self.assertLessEqual(cache.used, cache.memory_limit)
+
+    def test_clear(self):
+        """
+        Test that clear() forgets pages, boundaries and the page count.
+        """
+        cache = PageCache(5, key='user_id')
+        list(cache.iter_pages())
+        cache.clear()
+        self.assertEqual((dict(cache.pages), cache.boundaries,
+                          cache.page_count), ({}, {0: None}, None))
+
+
+class TestPageCacheCount(PageCacheTestCase):
+    """
+    Test how the page count is found and used.
+    """
+
+    def test_partial_last_page(self):
+        """
+        Test that a short page fixes the count and later pages cost
+        nothing.
+        """
+        cache = PageCache(5, key='user_id')
+        self.assertIsNone(cache.page_count)
+        cache.page(4)
+        self.assertEqual(cache.page_count, 5)
+        queries = self.queries
+        self.assertEqual(cache.page(5), [])
+        self.assertEqual(cache.page(50), [])
+        self.assertEqual(self.queries, queries)
+
+    def test_exact_multiple(self):
+        """
+        Test that a full last page is followed by one empty lookup.
+        """
+        cache = PageCache(self.ROWS, key='user_id')
+        self.assertEqual(len(cache.page(0)), self.ROWS)
+        self.assertIsNone(cache.page_count)
+        self.assertEqual(cache.page(1), [])
+        self.assertEqual(cache.page_count, 1)
+
+    def test_count_shrinks(self):
+        """
+        Test that a page past the end gives an upper bound that a later
+        page can lower.
+        """
+        for key in (None, 'user_id'):
+            with self.subTest(key=key):
+                cache = PageCache(5, key=key)
+                self.assertEqual(cache.page(9), [])
+                self.assertEqual(cache.page_count, 9)
+                cache.page(4)
+                self.assertEqual(cache.page_count, 5)
+                cache.page(2)
+                self.assertEqual(cache.page_count, 5)
+
+    def test_iter_pages_twice(self):
+        """
+        Test that a second walk is served entirely from the cache.
+        """
+        cache = PageCache(5, key='user_id')
+        first = [self.page_ids(page) for page in cache.iter_pages()]
+        queries = self.queries
+        second = [self.page_ids(page) for page in cache.iter_pages()]
+        self.assertEqual(first, second)
+        self.assertEqual(sum(first, []), self.ids)
+        self.assertEqual(self.queries, queries)
+
+
+class TestLazyPaginationCache(PageCacheTestCase):
+    """
+    Test lazy_pagination with a PageCache.
+    """
+
+    def test_pages_from_cache(self):
+        """
+        Test that lazy_pagination walks the cache's pages.
+        """
+        cache = PageCache(5, key='user_id')
+        pages = lazy_paginate.lazy_pagination(5, 'user_id', cache=cache)
+        self.assertEqual(sum(map(self.page_ids, pages), []), self.ids)
+
+    def test_mismatched_arguments(self):
+        """
+        Test that arguments the cache would ignore raise ValueError.
+        """
+        query = Query().where('age', '>', 25)
+        cache = PageCache(5, key='user_id', query=query)
+        cases = [
+            {'page_size': 10, 'key': 'user_id'},
+            {'page_size': 5, 'key': None},
+            {'page_size': 5, 'key': 'user_id', 'query': Query()},
+            {'page_size': 5, 'key': 'user_id', 'row_format': 'tuple'},
+            {'page_size': 5, 'key': 'user_id', 'prefetch': 2},
+        ]
+        for options in cases:
+            with self.subTest(**{name: repr(value)
+                                 for name, value in options.items()}):
+                with self.assertRaises(ValueError):
+                    next(lazy_paginate.lazy_pagination(cache=cache,
+                                                       **options))
+        pages = lazy_paginate.lazy_pagination(5, 'user_id', query=query,
+                                              cache=cache)
+        self.assertTrue(all(row['age'] > 25 for page in pages
+                            for row in page))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the parallel_csv module.
+"""
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from parallel_csv import chunk_offsets, parse_chunk, parse_csv_parallel
+seed = __import__('seed')
+
+
+def without_ids(rows):
+    """
+    Drop the random user_id from parsed row tuples.
+    """
+    return [row[1:] for row in rows]
+
+
+class CsvTestCase(unittest.TestCase):
+    """
+    Base class that writes CSV files into a temporary directory.
+    """
+
+    def setUp(self):
+        """
+        Create the directory.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, data, name='users.csv'):
+        """
+        Write bytes to a file in the directory and return its path.
+        """
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as file:
+            file.write(data)
+        return path
+
+
+class TestChunkOffsets(CsvTestCase):
+    """
+    Test cases for chunk_offsets.
+    """
+
+    def test_line_aligned(self):
+        """
+        Test that chunks are contiguous and end right after a newline.
+        """
+        data = b''.join(b'line %d\n' % i for i in range(100))
+        path = self.write(data)
+        for chunk_bytes in (1, 7, 50, 1000):
+            with self.subTest(chunk_bytes=chunk_bytes):
+                offsets = list(chunk_offsets(path, chunk_bytes, 3))
+                self.assertEqual(offsets[0][0], 3)
+                self.assertEqual(offsets[-1][1], len(data))
+                for (_, end), (start, _) in zip(offsets, offsets[1:]):
+                    self.assertEqual(end, start)
+                for _, end in offsets:
+                    self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_no_trailing_newline(self):
+        """
+        Test that the last chunk runs to the end of the file.
+        """
+        data = b'a\nbb\nccc'
+        path = self.write(data)
+        self.assertEqual(list(chunk_offsets(path, 1)),
+                         [(0, 2), (2, 5), (5, 8)])
+        self.assertEqual(list(chunk_offsets(path, 4)), [(0, 5), (5, 8)])
+
+    def test_start_at_end(self):
+        """
+        Test that nothing is yielded past the end of the file.
+        """
+        path = self.write(b'header\n')
+        self.assertEqual(list(chunk_offsets(path, 10, 7)), [])
+
+
+class TestParse(CsvTestCase):
+    """
+    Test that parallel parsing matches seed.read_csv_rows.
+    """
+
+    def rows(self, count):
+        """
+        Return CSV records with quoted commas and quotes in the names.
+        """
+        return [(f'Doe, "J{i}"' if i % 3 else f'User {i}',
+                 f'user{i}@example.com', str(18 + i % 70) + '.5')
+                for i in range(count)]
+
+    def write_csv(self, rows, header=('name', 'email', 'age'),
+                  line_end='\r\n', trailing_newline=True):
+        """
+        Write rows as CSV with the given header order and line endings.
+        """
+        path = os.path.join(self.directory, 'users.csv')
+        order = [('name', 'email', 'age').index(column) for column in header]
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file, lineterminator=line_end)
+            writer.writerow(header)
+            writer.writerows([row[i] for i in order] for row in rows)
+        if not trailing_newline:
+            with open(path, 'rb+') as file:
+                file.truncate(os.path.getsize(path) - len(line_end))
+        return path
+
+    def parallel(self, path, **options):
+        """
+        Return every row parse_csv_parallel yields, in order.
+        """
+        return [row for batch in parse_csv_parallel(path, **options)
+                for row in batch]
+
+    def test_matches_read_csv_rows(self):
+        """
+        Test quoted commas and \\r\\n endings across 10 KB chunks.
+        """
+        path = self.write_csv(self.rows(2000))
+        expected = without_ids(seed.read_csv_rows(path))
+        self.assertGreater(os.path.getsize(path), 50 << 10)
+        result = self.parallel(path, workers=2, chunk_bytes=10 << 10)
+        self.assertEqual(without_ids(result), expected)
+        self.assertEqual(len({row[0] for row in result}), len(result))
+
+    def test_variants(self):
+        """
+        Test \\n endings, a missing final newline and another column order.
+        """
+        cases = [
+            {'line_end': '\n'},
+            {'trailing_newline': False},
+            {'header': ('age', 'email', 'name')},
+        ]
+        for options in cases:
+            with self.subTest(**options):
+                path = self.write_csv(self.rows(300), **options)
+                expected = without_ids(seed.read_csv_rows(path))
+                self.assertEqual(len(expected), 300)
+                result = self.parallel(path, workers=2, chunk_bytes=1000,
+                                       max_pending=2)
+                self.assertEqual(without_ids(result), expected)
+
+    def test_parse_chunk_skips_blank_lines(self):
+        """
+        Test that empty lines inside a chunk are skipped.
+        """
+        path = self.write(b'name,email,age\nA,a@x,30\n\nB,b@x,40\n')
+        rows = parse_chunk(path, 15, os.path.getsize(path), (0, 1, 2))
+        self.assertEqual(without_ids(rows),
+                         [('A', 'a@x', 30.0), ('B', 'b@x', 40.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
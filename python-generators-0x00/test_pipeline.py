@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pipeline module.
+"""
+
+import random
+import threading
+import time
+import unittest
+from itertools import islice
+from pipeline import Pipeline
+
+
+def square(value):
+    """
+    Picklable stage function for process stages.
+    """
+    return value * value
+
+
+def jittered_square(value):
+    """
+    Square value after a short random sleep, so pooled calls finish
+    out of order.
+    """
+    time.sleep(random.random() / 1000)
+    return value * value
+
+
+def fail_on(bad):
+    """
+    Return a function that raises ValueError for bad and passes the
+    rest through.
+    """
+    def check(value):
+        if value == bad:
+            raise ValueError(f"bad value {value}")
+        return value
+    return check
+
+
+class Source:
+    """
+    A generator source that records how far it got and whether it was
+    closed.
+    """
+
+    def __init__(self, count, fail_at=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.produced = 0
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            for value in range(self.count):
+                if value == self.fail_at:
+                    raise ValueError(f"source failed at {value}")
+                self.produced += 1
+                yield value
+        finally:
+            self.closed = True
+
+
+class TestPipelineOrdering(unittest.TestCase):
+    """
+    Test that every kind of stage keeps the input order.
+    """
+
+    def test_stage_modes(self):
+        """
+        Test map and filter in every mode against the inline result.
+        """
+        expected = [value * value for value in range(200) if value % 3]
+        cases = [
+            {},
+            {'mode': 'thread'},
+            {'mode': 'thread', 'workers': 4},
+            {'workers': 4},
+        ]
+        for options in cases:
+            with self.subTest(**options):
+                pipeline = (Pipeline(range(200), queue_size=4)
+                            .filter(lambda value: value % 3, **options)
+                            .map(jittered_square, **options))
+                self.assertEqual(list(pipeline), expected)
+
+    def test_process_stage(self):
+        """
+        Test that a process stage returns results in input order.
+        """
+        pipeline = Pipeline(range(100)).map(square, mode='process',
+                                            workers=2, queue_size=8)
+        self.assertEqual(list(pipeline), [square(v) for v in range(100)])
+
+    def test_threaded_source(self):
+        """
+        Test that a threaded source yields every item in order.
+        """
+        pipeline = Pipeline(iter(range(1000)), mode='thread', queue_size=2)
+        self.assertEqual(list(pipeline), list(range(1000)))
+
+    def test_batch_and_window(self):
+        """
+        Test batch sizes and sliding windows with a step.
+        """
+        self.assertEqual(list(Pipeline(range(7)).batch(3)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(Pipeline(range(7)).window(3, step=2)),
+                         [(0, 1, 2), (2, 3, 4), (4, 5, 6)])
+
+    def test_invalid_modes(self):
+        """
+        Test that unknown and unsupported modes raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            Pipeline(range(3), mode='process')
+        with self.assertRaises(ValueError):
+            Pipeline(range(3)).map(square, mode='fiber')
+
+
+class TestPipelineErrors(unittest.TestCase):
+    """
+    Test that exceptions reach the consumer after the items before them.
+    """
+
+    def collect(self, pipeline):
+        """
+        Return the items seen before the pipeline raised, and the error.
+        """
+        seen = []
+        with self.assertRaises(ValueError) as cm:
+            for item in pipeline:
+                seen.append(item)
+        return seen, cm.exception
+
+    def test_source_error(self):
+        """
+        Test that a failing threaded source re-raises in the consumer.
+        """
+        source = Source(100, fail_at=10)
+        seen, error = self.collect(Pipeline(source, mode='thread'))
+        self.assertEqual(seen, list(range(10)))
+        self.assertIn('source failed at 10', str(error))
+        self.assertTrue(source.closed)
+
+    def test_stage_error(self):
+        """
+        Test that a failing map stage re-raises in every mode.
+        """
+        for options in ({}, {'mode': 'thread'}, {'workers': 4},
+                        {'mode': 'thread', 'workers': 4}):
+            with self.subTest(**options):
+                pipeline = Pipeline(range(100)).map(fail_on(20), **options)
+                seen, error = self.collect(pipeline)
+                self.assertEqual(seen, list(range(20)))
+                self.assertIn('bad value 20', str(error))
+
+
+class TestPipelineEarlyClose(unittest.TestCase):
+    """
+    Test that a consumer that stops early shuts the stages down.
+    """
+
+    def test_threaded_source_close(self):
+        """
+        Test closing a threaded source stops its thread and the source.
+        """
+        threads = threading.active_count()
+        source = Source(10 ** 6)
+        items = iter(Pipeline(source, mode='thread', queue_size=4))
+        self.assertEqual(list(islice(items, 5)), list(range(5)))
+        items.close()
+        self.assertTrue(source.closed)
+        self.assertLess(source.produced, 100)
+        self.assertEqual(threading.active_count(), threads)
+
+    def test_threaded_stage_close(self):
+        """
+        Test closing a pipeline with a threaded map stage stops it.
+        """
+        threads = threading.active_count()
+        source = Source(10 ** 6)
+        items = iter(Pipeline(source).map(square, mode='thread',
+                                          queue_size=4))
+        self.assertEqual(list(islice(items, 3)), [0, 1, 4])
+        items.close()
+        self.assertLess(source.produced, 100)
+        self.assertEqual(threading.active_count(), threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the query module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import sqlite_compat
+from query import Query
+
+
+class TestQuerySql(unittest.TestCase):
+    """
+    Test the statements Query.sql builds.
+    """
+
+    def test_plain(self):
+        """
+        Test a query with no key, filters or limit.
+        """
+        self.assertEqual(Query().sql(), ("SELECT * FROM user_data", ()))
+
+    def test_single_key(self):
+        """
+        Test a keyset seek on one column.
+        """
+        statement, params = Query(['age']).where('age', '>', 25).sql(
+            'user_id', 'abc', limit=10)
+        self.assertEqual(statement,
+                         "SELECT age, user_id FROM user_data "
+                         "WHERE age > %s AND user_id > %s "
+                         "ORDER BY user_id LIMIT %s")
+        self.assertEqual(params, (25, 'abc', 10))
+
+    def test_composite_key(self):
+        """
+        Test that a composite key expands into one OR branch per column.
+        """
+        statement, params = Query(['name']).sql(
+            ('age', 'name', 'user_id'), (30, 'Ann', 'u1'), limit=5,
+            offset=10)
+        self.assertEqual(statement,
+                         "SELECT name, age, user_id FROM user_data WHERE "
+                         "((age > %s) OR (age = %s AND name > %s) OR "
+                         "(age = %s AND name = %s AND user_id > %s)) "
+                         "ORDER BY age, name, user_id LIMIT %s OFFSET %s")
+        self.assertEqual(params,
+                         (30, 30, 'Ann', 30, 'Ann', 'u1', 5, 10))
+
+    def test_composite_key_first_page(self):
+        """
+        Test that a composite key with no after value only orders.
+        """
+        statement, params = Query().sql(('age', 'user_id'), limit=5)
+        self.assertEqual(statement, "SELECT * FROM user_data "
+                                    "ORDER BY age, user_id LIMIT %s")
+        self.assertEqual(params, (5,))
+
+    def test_unknown_key(self):
+        """
+        Test that key columns are checked against user_data.
+        """
+        for key in ('password', ('age', 'password')):
+            with self.subTest(key=key):
+                with self.assertRaises(ValueError):
+                    Query().sql(key, 'x')
+
+
+class TestCompositeKeyset(unittest.TestCase):
+    """
+    Test composite keyset pages against SQLite.
+    """
+
+    def setUp(self):
+        """
+        Create a user_data table where ages repeat.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'users.db')
+        self.ids = sqlite_compat.create_users(path, 40)
+        self.connection = sqlite_compat.connect(path)
+        self.addCleanup(self.connection.close)
+        cursor = self.connection.cursor()
+        cursor.execute("UPDATE user_data SET age = 18 + age % 5")
+        cursor.execute("SELECT user_id, age FROM user_data")
+        self.rows = cursor.fetchall()
+
+    def test_pages_cover_table_once(self):
+        """
+        Test that seeking past each page's last key visits every row
+        once, in (age, user_id) order, across ties in age.
+        """
+        key = ('age', 'user_id')
+        cursor = self.connection.cursor()
+        seen = []
+        after = None
+        while True:
+            cursor.execute(*Query(['user_id']).sql(key, after, limit=7))
+            page = cursor.fetchall()
+            if not page:
+                break
+            self.assertLessEqual(len(page), 7)
+            seen.extend(page)
+            user_id, age = page[-1]
+            after = (age, user_id)
+        expected = sorted(self.rows, key=lambda row: (row[1], row[0]))
+        self.assertEqual([tuple(row) for row in seen], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
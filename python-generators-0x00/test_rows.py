@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the rows module and for the row_format argument of the
+streaming generators, against SQLite through sqlite_compat.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+import sqlite_compat
+from checkpoint import Checkpoint
+from query import Query
+from rows import ROW_FORMATS, check_row_format, convert_rows
+stream_users = __import__('0-stream_users').stream_users
+stream_users_in_batches = __import__(
+    '1-batch_processing').stream_users_in_batches
+lazy_paginate = __import__('2-lazy_paginate')
+
+NAMES = ('user_id', 'age')
+
+
+def user_id(row):
+    """
+    Read user_id from a row of any format.
+    """
+    if isinstance(row, dict):
+        return row['user_id']
+    if hasattr(row, 'user_id'):
+        return row.user_id
+    return row[0]
+
+
+class TestConvertRows(unittest.TestCase):
+    """
+    Test cases for check_row_format and convert_rows.
+    """
+
+    def test_unknown_format(self):
+        """
+        Test that an unknown row format raises ValueError.
+        """
+        with self.assertRaises(ValueError):
+            check_row_format('list')
+
+    def test_formats(self):
+        """
+        Test that every format exposes the same values.
+        """
+        rows = [('a', 30), ('b', 40)]
+        self.assertIs(convert_rows(NAMES, rows, 'tuple'), rows)
+        self.assertEqual(convert_rows(NAMES, rows, 'dict'),
+                         [{'user_id': 'a', 'age': 30},
+                          {'user_id': 'b', 'age': 40}])
+        for row_format in ('namedtuple', 'record'):
+            with self.subTest(row_format=row_format):
+                converted = convert_rows(NAMES, rows, row_format)
+                self.assertEqual([(row.user_id, row.age)
+                                  for row in converted], rows)
+
+    def test_classes_are_cached(self):
+        """
+        Test that one class is built per column list, not per row.
+        """
+        for row_format in ('namedtuple', 'record'):
+            with self.subTest(row_format=row_format):
+                first, second = convert_rows(NAMES, [('a', 1), ('b', 2)],
+                                             row_format)
+                self.assertIs(type(first), type(second))
+
+    def test_record_has_no_dict(self):
+        """
+        Test that record rows use __slots__ and keep a readable repr.
+        """
+        (row,) = convert_rows(NAMES, [('a', 30)], 'record')
+        self.assertFalse(hasattr(row, '__dict__'))
+        self.assertEqual(repr(row), "UserRecord(user_id='a', age=30)")
+
+
+class TestQueryApplyTuples(unittest.TestCase):
+    """
+    Test Query.apply_tuples, which filters before converting.
+    """
+
+    def test_predicates_see_dicts(self):
+        """
+        Test that predicates get dicts whatever the row format.
+        """
+        query = Query().filter(lambda row: row['age'] > 35)
+        rows = [('a', 30), ('b', 40)]
+        for row_format in ROW_FORMATS:
+            with self.subTest(row_format=row_format):
+                kept = query.apply_tuples(NAMES, rows, row_format)
+                self.assertEqual([user_id(row) for row in kept], ['b'])
+
+
+class TestGeneratorRowFormats(unittest.TestCase):
+    """
+    Test every generator in every row format, with and without a
+    Python-side predicate.
+    """
+
+    ROWS = 23
+    OLDER = 30
+
+    def setUp(self):
+        """
+        Point seed.connect_to_prodev at a SQLite user_data table.
+        """
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        path = os.path.join(self.directory, 'users.db')
+        self.ids = sqlite_compat.create_users(path, self.ROWS)
+        serving = sqlite_compat.serving_prodev(path)
+        serving.__enter__()
+        self.addCleanup(serving.__exit__, None, None, None)
+
+    def cases(self):
+        """
+        Yield (row_format, query, expected user_ids) for every format,
+        with no predicate and with one on age.
+        """
+        older = self.ids[self.OLDER - 18 + 1:]
+        for row_format in ROW_FORMATS:
+            yield row_format, Query(), self.ids
+            yield row_format, Query().filter(
+                lambda row: row['age'] > self.OLDER), older
+
+    def check(self, rows_for):
+        """
+        Assert rows_for(row_format, query) yields the expected rows, in
+        the requested format, for every case.
+        """
+        for row_format, query, expected in self.cases():
+            with self.subTest(row_format=row_format,
+                              predicate=bool(query.predicates)):
+                rows = list(rows_for(row_format, query))
+                # Scans without a key have no ORDER BY.
+                self.assertEqual(sorted(user_id(row) for row in rows),
+                                 expected)
+                if row_format == 'dict':
+                    self.assertIsInstance(rows[0], dict)
+                else:
+                    self.assertNotIsInstance(rows[0], dict)
+
+    def test_stream_users(self):
+        """
+        Test stream_users without a checkpoint.
+        """
+        self.check(lambda row_format, query: stream_users(
+            5, query, row_format=row_format))
+
+    def test_stream_users_checkpoint(self):
+        """
+        Test stream_users with a checkpoint.
+        """
+        path = os.path.join(self.directory, 'scan.json')
+
+        def rows_for(row_format, query):
+            checkpoint = Checkpoint(path)
+            checkpoint.reset()
+            return stream_users(5, query, checkpoint, row_format)
+        self.check(rows_for)
+
+    def test_stream_users_in_batches(self):
+        """
+        Test stream_users_in_batches with OFFSET and keyset pages.
+        """
+        for key in (None, 'user_id'):
+            with self.subTest(key=key):
+                self.check(lambda row_format, query: (
+                    row for batch in stream_users_in_batches(
+                        5, key, query, row_format=row_format)
+                    for row in batch))
+
+    def test_lazy_pagination(self):
+        """
+        Test lazy_pagination with and without prefetching.
+        """
+        for prefetch in (0, 2):
+            with self.subTest(prefetch=prefetch):
+                self.check(lambda row_format, query: (
+                    row for page in lazy_paginate.lazy_pagination(
+                        5, 'user_id', query, prefetch, row_format)
+                    for row in page))
+
+    def test_page_cache(self):
+        """
+        Test PageCache pages.
+        """
+        self.check(lambda row_format, query: (
+            row for page in lazy_paginate.PageCache(
+                5, 'user_id', query, row_format=row_format).iter_pages()
+            for row in page))
+
+    def test_columnar_predicate(self):
+        """
+        Test that columnar batches see the same predicate results.
+        """
+        query = Query().filter(lambda row: row['age'] > self.OLDER)
+        batches = stream_users_in_batches(5, 'user_id', query,
+                                          columnar='array')
+        ids = [value for batch in batches for value in batch['user_id']]
+        self.assertEqual(ids, self.ids[self.OLDER - 18 + 1:])
+
+
+if __name__ == '__main__':
+    unittest.main()
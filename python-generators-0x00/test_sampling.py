@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the sampling module.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sqlite_compat
+from sampling import approximate_average_age, reservoir_sample
+
+
+class TestReservoirSample(unittest.TestCase):
+    """
+    Test cases for reservoir_sample.
+    """
+
+    def test_size_and_membership(self):
+        """
+        Test that the sample has k distinct items from the stream.
+        """
+        for k in (1, 5, 100):
+            with self.subTest(k=k):
+                sample = reservoir_sample(range(1000), k, random.Random(k))
+                self.assertEqual(len(sample), k)
+                self.assertEqual(len(set(sample)), k)
+                self.assertTrue(all(0 <= item < 1000 for item in sample))
+
+    def test_uniform(self):
+        """
+        Test that every position is picked about k / n of the time.
+        """
+        rng = random.Random(0)
+        n, k, trials = 20, 5, 4000
+        counts = [0] * n
+        for _ in range(trials):
+            for item in reservoir_sample(iter(range(n)), k, rng):
+                counts[item] += 1
+        expected = trials * k / n
+        for count in counts:
+            self.assertAlmostEqual(count, expected, delta=expected * 0.15)
+
+    def test_zero(self):
+        """
+        Test that k=0 returns an empty sample without reading the stream.
+        """
+        def stream():
+            raise AssertionError("stream was read")
+            yield
+        self.assertEqual(reservoir_sample(stream(), 0), [])
+
+    def test_negative(self):
+        """
+        Test that a negative k raises ValueError.
+        """
+        with self.assertRaises(ValueError):
+            reservoir_sample(range(10), -1)
+
+    def test_short_stream(self):
+        """
+        Test that a stream shorter than k is returned whole, in order.
+        """
+        self.assertEqual(reservoir_sample(iter(range(3)), 5), [0, 1, 2])
+        self.assertEqual(reservoir_sample([], 5), [])
+
+
+class TestApproximateAverageAge(unittest.TestCase):
+    """
+    Test approximate_average_age against SQLite through sqlite_compat.
+    """
+
+    def setUp(self):
+        """
+        Point seed.connect_to_prodev at a SQLite user_data table.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'users.db')
+        sqlite_compat.create_users(path, 23)
+        serving = sqlite_compat.serving_prodev(path)
+        self.connections = serving.__enter__()
+        self.addCleanup(serving.__exit__, None, None, None)
+
+    def test_block(self):
+        """
+        Test that block samples give a mean inside its interval.
+        """
+        result = approximate_average_age(sample_size=20)
+        # Every random seek lands before 'id-', so both blocks read the
+        # first ten users, who are counted once.
+        self.assertEqual(result['sample'], 10)
+        self.assertEqual(result['estimate'], 22.5)
+        self.assertLess(result['low'], 22.5)
+        self.assertGreater(result['high'], 22.5)
+        self.assertEqual(len(self.connections), 1)
+
+    def test_unknown_method(self):
+        """
+        Test that an unknown method raises ValueError.
+        """
+        with self.assertRaises(ValueError):
+            approximate_average_age(method='systematic')
+
+    def test_bad_fraction(self):
+        """
+        Test that a fraction outside (0, 1] raises ValueError.
+        """
+        for fraction in (0, 1.5):
+            with self.subTest(fraction=fraction):
+                with self.assertRaises(ValueError):
+                    approximate_average_age(method='bernoulli',
+                                            fraction=fraction)
+
+
+if __name__ == '__main__':
+    unittest.main()